@@ -3,38 +3,51 @@
 # main.py - FastAPI Application
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 
-import uvicorn
-import sys
+import asyncio
+import logging
 import os
-from utils.ai_client import cost_monitor
-
-# Add the Backend directory to Python path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Routers
 from routers import analysis, documents, agent
 from models.database import init_firebase
-from utils.ai_client import init_ai_clients
+from utils import ai_client
+from utils.ai_client import init_ai_clients, GEMINI_EXECUTOR
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="AI Startup Analyst", version="1.0.0")
+# Initialize services
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Starting up...")
+
+    # Firebase and Gemini setup are independent blocking calls, run them side by side
+    await asyncio.gather(
+        asyncio.to_thread(init_firebase),
+        asyncio.to_thread(init_ai_clients)
+    )
+    yield
+    
+    GEMINI_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(
+    title="AI Startup Analyst",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
 # CORS for React frontend
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "https://ventureval-ef705.web.app"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type", "X-Requested-With", "X-Skip-Suggestions"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
-# Initialize services
-@app.on_event("startup")
-async def startup_event():
-    print("Starting up...")
-    init_firebase()
-    init_ai_clients()
-
 # Include routers
 app.include_router(analysis.router, prefix="/analysis", tags=["analysis"])
 app.include_router(documents.router, prefix="/documents", tags=["documents"])
@@ -48,14 +61,12 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
-
-
 @app.get("/api/admin/usage")
 async def get_usage_stats():
     """Get current usage statistics"""
     
+    # cost_monitor is assigned during startup, so read it off the module
+    cost_monitor = ai_client.cost_monitor
     if cost_monitor:
         return {
             'daily_usage': cost_monitor.usage_tracking,
@@ -65,3 +76,8 @@ async def get_usage_stats():
     
     return {'status': 'monitoring_unavailable'}
 
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8000)
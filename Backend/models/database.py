@@ -14,49 +14,64 @@
 
 # models/database.py
 import firebase_admin
-from firebase_admin import credentials, firestore, storage
+from firebase_admin import credentials, firestore_async, storage
 from settings import BUCKET_ID, FIREBASE_CONFIG_JSON
+from functools import cache
+import threading
+import logging
 import json
-# Global clients
-firestore_client = None
-storage_bucket = None
+
+logger = logging.getLogger(__name__)
+
+# Service account credentials, parsed once rather than on every init attempt
+_FIREBASE_CREDENTIALS = json.loads(FIREBASE_CONFIG_JSON) if FIREBASE_CONFIG_JSON else None
+
+# Guards the one-time firebase_admin.initialize_app call
+_init_lock = threading.Lock()
+
+def _ensure_firebase_app():
+    """Initialize the default Firebase app exactly once"""
+    if firebase_admin._apps:
+        return
+    
+    with _init_lock:
+        if firebase_admin._apps:
+            return
+        
+        # Initialize with service account key
+        if _FIREBASE_CREDENTIALS:
+            cred = credentials.Certificate(_FIREBASE_CREDENTIALS)
+        else:
+            # Use default credentials in production
+            cred = credentials.ApplicationDefault()
+        
+        firebase_admin.initialize_app(cred, {
+            'storageBucket': BUCKET_ID
+        })
 
 def init_firebase():
     """Initialize Firebase Admin SDK"""
-    global firestore_client, storage_bucket
     
     try:
-        # Initialize with service account key
-        if not firebase_admin._apps:
-            if FIREBASE_CONFIG_JSON:
-                cred = credentials.Certificate(json.loads(FIREBASE_CONFIG_JSON))
-            else:
-                # Use default credentials in production
-                cred = credentials.ApplicationDefault()
-            
-            firebase_admin.initialize_app(cred, {
-                'storageBucket': BUCKET_ID
-            })
-        
-        firestore_client = firestore.client()
-        storage_bucket = storage.bucket()
+        # Warm the app and bucket so the first request doesn't pay for it. The
+        # async Firestore client binds to the serving loop, so it stays lazy
+        _ensure_firebase_app()
+        get_storage_bucket()
         
-        print("Firebase initialized successfully")
+        logger.info("Firebase initialized successfully")
         
     except Exception as e:
-        print(f"Firebase initialization failed: {e}")
+        logger.error(f"Firebase initialization failed: {e}")
         raise e
 
-def get_firestore_client():
-    """Get Firestore client"""
-    global firestore_client
-    if firestore_client is None:
-        init_firebase()
-    return firestore_client
+@cache
+def get_async_firestore_client():
+    """Get async Firestore client (created lazily, as it binds to the running event loop)"""
+    _ensure_firebase_app()
+    return firestore_async.client()
 
+@cache
 def get_storage_bucket():
     """Get Firebase Storage bucket"""
-    global storage_bucket
-    if storage_bucket is None:
-        init_firebase()
-    return storage_bucket
\ No newline at end of file
+    _ensure_firebase_app()
+    return storage.bucket()
@@ -1,22 +1,35 @@
 # Pydantic models
 
 # models/schemas.py
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional, Dict
 from enum import Enum
+from types import MappingProxyType
+
+# Scoring dimensions weighted by WeightingCalculator (read-only, copy before use)
+DEFAULT_WEIGHTS = MappingProxyType({
+    "growth_potential": 0.25,
+    "market_opportunity": 0.20,
+    "team_quality": 0.20,
+    "product_technology": 0.15,
+    "financial_metrics": 0.10,
+    "competitive_position": 0.10
+})
 
 class WeightingConfig(BaseModel):
     profile_name: str = "Default (Custom)"
-    weights: Dict[str, float] = Field(
-        default={
-            "growth_potential": 0.25,
-            "market_opportunity": 0.20,
-            "team_quality": 0.20,
-            "product_technology": 0.15,
-            "financial_metrics": 0.10,
-            "competitive_position": 0.10
-        }
-    )
+    weights: Dict[str, float] = Field(default_factory=DEFAULT_WEIGHTS.copy)
+
+    @field_validator('weights')
+    @classmethod
+    def validate_weights(cls, weights: Dict[str, float]) -> Dict[str, float]:
+        """Reject incomplete weightings or ones that don't sum to 100%"""
+        missing = DEFAULT_WEIGHTS.keys() - weights.keys()
+        if missing:
+            raise ValueError(f"Missing weights for: {', '.join(sorted(missing))}")
+        if abs(sum(weights.values()) - 1.0) > 0.01:
+            raise ValueError("Weights must sum to 100%")
+        return weights
 
 class AnalysisRequest(BaseModel):
     storage_paths: List[str]
@@ -33,7 +46,6 @@ class AnalysisResponse(BaseModel):
 class ChatRequest(BaseModel):
     analysis_id: str
     question: str
-    context: Optional[Dict[str, Any]] = {}
 
 class ChatResponse(BaseModel):
     response: str
@@ -1,18 +1,25 @@
 # routers/agent.py
-from fastapi import APIRouter, HTTPException
-from google import genai
-from google.genai import types
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import StreamingResponse
+from google.genai import types, errors
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 import json
 import logging
+import orjson
 import asyncio
 import re
+import time
+from functools import lru_cache
+from cachetools import TTLCache
 
 from models.schemas import ChatRequest, ChatResponse
-from models.database import get_firestore_client
-from utils.ai_client import monitor_usage, configure_gemini
-from settings import PROJECT_ID, GCP_REGION
+from models.database import get_async_firestore_client
+from utils.ai_client import monitor_usage, get_gemini_client, GEMINI_CHAT_SEMAPHORE
 from utils.enhanced_text_cleaner import sanitize_for_frontend, clean_response_dict, clean_response_text
+from services.chat_context import (
+    analysis_chat_cache, analysis_context_caches, build_chat_context, build_context_prompt,
+    has_current_chat_context, CONTEXT_CACHE_TTL_SECONDS
+)
 
 
 router = APIRouter(prefix="/agent", tags=["agent"])
@@ -58,42 +65,285 @@ QUESTION_CATEGORIES = {
     ]
 }
 
+# Follow-up question templates used when the model returns fewer than four
+# suggestions. {company_name} is filled in per request.
+TIER_FOLLOW_UPS = {
+    'PASS': (
+        "What would need to change to make this investment viable?",
+        "Are there any pivot opportunities that could improve the outlook?",
+        "What are the key deal-breakers in this analysis?"
+    ),
+    'PURSUE': (
+        "What due diligence priorities should we focus on?",
+        "What terms and valuation would be appropriate?",
+        "What could derail this promising opportunity?"
+    ),
+    'CONSIDER': (
+        "What additional information would tip the decision?",
+        "What are the key risk mitigation strategies?",
+        "How does this compare to other pipeline opportunities?"
+    )
+}
+
+CATEGORY_FOLLOW_UPS = {
+    'financial': (
+        "How do the unit economics compare to successful companies in this sector?",
+        "What are the key assumptions in their financial projections?"
+    ),
+    'risk': (
+        "Which risks pose the greatest threat to investor returns?",
+        "How has management addressed similar risks in the past?",
+        "What early warning indicators should we monitor post-investment?"
+    ),
+    'market': (
+        "What's the competitive response likely to be if {company_name} succeeds?",
+        "How defensible is their market position long-term?",
+        "What market shifts could create new opportunities or threats?"
+    ),
+    'team': (
+        "What key hires are critical for the next growth phase?",
+        "How does the team's experience match the execution challenges ahead?",
+        "What governance and board composition would be optimal?"
+    ),
+    'product': (
+        "What's the roadmap for maintaining competitive advantage?",
+        "How strong is the intellectual property position?",
+        "What's the customer feedback on product-market fit?"
+    ),
+    'growth': (
+        "What are the biggest bottlenecks to scaling?",
+        "How capital efficient is their growth strategy?",
+        "What's the total addressable market they can realistically capture?"
+    )
+}
+
+INVESTMENT_PROCESS_FOLLOW_UPS = (
+    "What's our expected return profile and exit timeline?",
+    "How does this fit our portfolio strategy and thesis?",
+    "What would be our value-add beyond capital?"
+)
+
+# Keyword scan table built once at import: (category, ((keyword, weight), ...)).
+# Longer, more specific keywords carry a higher weight.
+CATEGORY_KEYWORD_WEIGHTS = tuple(
+    (category, tuple((keyword, len(keyword.split())) for keyword in keywords))
+    for category, keywords in QUESTION_CATEGORIES.items()
+)
+
+# Successful AI answers keyed by (analysis id, updated_at, normalized question).
+# A reweight bumps updated_at, so the TTL only bounds memory, not staleness.
+_ai_response_cache = TTLCache(maxsize=2048, ttl=900)
+
+# Concurrent chat reads of the same analysis, sharing one Firestore read
+_analysis_fetches: Dict[str, asyncio.Future] = {}
+
+# Analyses last seen still processing. Their chat reads fetch the whole document
+# directly, since a masked read would come back without a stored context
+_analyses_in_progress = TTLCache(maxsize=1024, ttl=120)
+
+# Generation settings for chat answers, built once rather than per request
+_SAFETY_SETTINGS = [
+    types.SafetySetting(category=category, threshold="BLOCK_MEDIUM_AND_ABOVE")
+    for category in (
+        "HARM_CATEGORY_HARASSMENT",
+        "HARM_CATEGORY_HATE_SPEECH",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "HARM_CATEGORY_DANGEROUS_CONTENT",
+    )
+]
+
+# Constrains the answer to the JSON shape the prompt asks for, so the model
+# can't wrap it in prose or fences. "response" stays first for streaming
+_CHAT_RESPONSE_SCHEMA = types.Schema(
+    type="OBJECT",
+    properties={
+        'response': types.Schema(type="STRING"),
+        'suggested_questions': types.Schema(
+            type="ARRAY",
+            items=types.Schema(type="STRING"),
+            max_items=4
+        )
+    },
+    required=['response', 'suggested_questions'],
+    property_ordering=['response', 'suggested_questions']
+)
+
+_CHAT_GENERATION_CONFIG = types.GenerateContentConfig(
+    temperature=0.3,  # Controlled temperature for focused responses
+    top_p=0.9,  # Focused token selection for conciseness
+    top_k=40,
+    candidate_count=1,
+    safety_settings=_SAFETY_SETTINGS,
+    response_mime_type="application/json",
+    response_schema=_CHAT_RESPONSE_SCHEMA
+)
+
+# Analysis fields read by the chat path when the stored chat context is current,
+# and all that is kept of a completed analysis in the in-memory cache
+CHAT_FIELD_PATHS = [
+    'id',
+    'status',
+    'progress',
+    'updated_at',
+    'company_name',
+    'chat_context',
+    'processed_data.synthesized_data.sector',
+    'processed_data.synthesized_data.stage',
+    'processed_data.synthesized_data.financials',
+    'risk_assessment.overall_risk_score',
+    'weighted_scores.overall_score',
+    'weighted_scores.recommendation',
+]
+
+# Static analyst instructions. Identical for every chat, so they are sent as the
+# system instruction and cached on Vertex rather than resent with each question.
+ANALYST_SYSTEM_PROMPT = """You are a senior investment analyst and startup advisor with 15+ years of experience in venture capital. You have conducted a comprehensive analysis of the company described in the analysis data you are given and are now answering investor questions with professional expertise. You are a friendly, approachable investment professional who maintains warm relationships while providing data-driven insights.
+
+RESPONSE GUIDELINES:
+1. Answer as an experienced investment professional who has thoroughly analyzed this company
+2. Handle greetings warmly and redirect to investment discussion professionally
+3. For out-of-scope questions, politely explain limitations and redirect to investment topics
+4. Reference ONLY the specific data points from the provided analysis data for investment questions
+5. If a field is absent from the data, say it was not disclosed
+6. Be direct and actionable - investors need clear, decisive guidance
+7. Frame responses in terms of investment implications and decision-making criteria
+8. Use professional VC terminology and investment frameworks
+9. Consider the company's stage and sector when providing guidance
+10. Always tie insights back to potential returns, risks, and investment attractiveness
+11. Maintain a friendly but professional tone throughout all interactions
+
+CONVERSATION CONTEXT:
+This is a Q&A session with an investor who is evaluating this company for potential investment. You are a professional investment analyst friend who provides data-driven insights to make informed investment decisions. The investor values CONCISE, FOCUSED answers.
+
+CRITICAL INSTRUCTION: You must provide BOTH a response to the question AND 4 suggested follow-up questions in a specific JSON format.
+
+RESPONSE HANDLING GUIDELINES:
+
+1. GREETINGS & PLEASANTRIES:
+   If the question is a greeting (hello, hi, how are you, good morning, etc.), respond warmly and professionally:
+   - Example: "I'm well, thank you. I'm ready to dive into our discussion regarding [Company Name] and address any questions you have about its investment potential. We have a comprehensive analysis prepared to guide our conversation. Please feel free to begin with your first inquiry."
+   - Always redirect to the investment analysis after acknowledging the greeting
+   - Maintain a friendly but professional investment analyst tone
+
+2. OUT-OF-SCOPE QUESTIONS:
+   If the question is beyond investment analysis scope (cultural events, personal topics, unrelated subjects, etc.), respond politely:
+   - Acknowledge the question courteously
+   - Clearly state the limitation: "The provided investment analysis for [Company Name] focuses exclusively on the company's financial performance, market position, team, product, and associated investment risks. Information regarding [topic] is outside the scope of this investment analysis and is not available in the provided data."
+   - Redirect with a follow-up: "However, I'd be happy to discuss any aspects of [Company Name]'s investment potential. What specific investment considerations would you like to explore?"
+   - Be polite but firm about scope boundaries
+
+3. INVESTMENT-RELATED QUESTIONS:
+   For questions within scope, follow the standard analysis approach:
+   - First, identify what specific aspect of the investment the question addresses (financial, risk, market, team, product, etc.)
+   - Reference relevant data points from the provided analysis data
+   - Provide quantitative context and benchmarking where available
+   - Explain the investment implications clearly
+   - Consider the company's stage and sector context
+   - Suggest follow-up considerations if relevant
+
+RESPONSE REQUIREMENTS:
+• Keep response STRICTLY within 30-150 words - this is critical for user experience
+• For greetings: Be warm, acknowledge, and redirect to investment discussion
+• For out-of-scope: Be polite, explain limitations, and redirect with investment-focused follow-up
+• For investment questions: Answer directly with supporting data
+• Start with a direct, clear response to the question type
+• Support with 1-2 key data points from the analysis when relevant
+• Use concise bullet points if listing multiple items
+• End with one brief actionable insight related to the question
+• If data is missing, briefly acknowledge in 1 sentence
+• Maintain professional investment analyst tone throughout
+• Be precise and eliminate unnecessary words
+• WORD COUNT LIMIT: Maximum 150 words, target 40-130 words
+• IMPORTANT: Complete your response fully within the word limit
+
+SUGGESTED QUESTIONS REQUIREMENTS:
+Generate 4 highly relevant follow-up questions that an investor would naturally ask next. Focus on:
+1. Investment decision-making factors
+2. Due diligence priorities
+3. Risk assessment and mitigation
+4. Return potential and exit strategy
+5. Competitive positioning and market dynamics
+6. Management team and execution capability
+
+Requirements for suggestions:
+- Questions should be specific to this company's situation
+- Focus on actionable investment insights
+- Consider the recommendation tier when framing questions
+- Address potential investor concerns
+- Help investors make informed decisions
+- Be professional and direct
+- Avoid questions too similar to the current question
+- Each suggested question must be between 10-30 words maximum
+- Keep questions concise and focused for better user experience
+
+MANDATORY JSON OUTPUT FORMAT:
+You MUST respond with a valid JSON object in exactly this format:
+{
+    "response": "Your 30-150 word response to the investor question here",
+    "suggested_questions": [
+        "First suggested follow-up question",
+        "Second suggested follow-up question", 
+        "Third suggested follow-up question",
+        "Fourth suggested follow-up question"
+    ]
+}
+
+IMPORTANT: Your entire output must be valid JSON. Do not include any text before or after the JSON object."""
+
+QUESTION_PROMPT_TEMPLATE = """INVESTOR QUESTION: "{question}"
+QUESTION CATEGORY: {question_category}"""
+
+CHAT_PROMPT_TEMPLATE = "{context_prompt}\n" + QUESTION_PROMPT_TEMPLATE
+
+CHAT_MODEL = "gemini-2.5-flash"
+
+# Explicit Vertex cache of ANALYST_SYSTEM_PROMPT, recreated shortly before it expires.
+# If it cannot be created the prompt is sent inline and creation is retried later.
+ANALYST_CACHE_TTL_SECONDS = 3600
+ANALYST_CACHE_REFRESH_MARGIN_SECONDS = 300
+ANALYST_CACHE_RETRY_SECONDS = 600
+
+_CHAT_INLINE_CONFIG = _CHAT_GENERATION_CONFIG.model_copy(update={'system_instruction': ANALYST_SYSTEM_PROMPT})
+
+# Per-analysis Vertex caches that failed to create or were refused at generation are
+# remembered for the retry window so later turns go straight to the inline path. The
+# created caches themselves live in services.chat_context, where reweighting invalidates them.
+_analysis_context_cache_failures = TTLCache(maxsize=512, ttl=ANALYST_CACHE_RETRY_SECONDS)
+_analysis_context_cache_pending: Dict[tuple, asyncio.Future] = {}
+_analyst_cache_lock = asyncio.Lock()
+_analyst_cache_config = _CHAT_INLINE_CONFIG
+_analyst_cache_refresh_at = 0.0
+
 @router.post("/chat", response_model=ChatResponse)
 @monitor_usage("gemini_requests")
-async def agent_chat(request: ChatRequest):
+async def agent_chat(
+    request: ChatRequest,
+    skip_suggestions: bool = Header(False, alias="X-Skip-Suggestions")
+):
     """Handle agent conversations with comprehensive analysis context"""
     
     analysis_data = None
     
     try:
-        # Enhanced input validation
-        if not request.analysis_id or not request.analysis_id.strip():
-            raise HTTPException(status_code=400, detail="Analysis ID is required")
-        
-        if not request.question or not request.question.strip():
-            raise HTTPException(status_code=400, detail="Question is required")
-        
-        if len(request.question.strip()) > 1000:
-            raise HTTPException(status_code=400, detail="Question too long (max 1000 characters)")
+        validate_chat_request(request)
         
         # Get analysis context asynchronously (single fetch)
         analysis_data = await get_analysis_data(request.analysis_id.strip())
         
-        # Build enhanced context prompt
-        context_prompt = await build_context_prompt(analysis_data)
-        
         # Generate AI response with suggestions in a single API call
         try:
-            ai_result = await generate_ai_response_with_suggestions(context_prompt, request.question.strip(), analysis_data)
+            ai_result = await generate_ai_response_with_suggestions(
+                request.analysis_id.strip(), request.question.strip(), analysis_data, skip_suggestions
+            )
             return ChatResponse(
                 response=ai_result['response'],
                 suggested_questions=ai_result['suggested_questions'],
                 analysis_id=request.analysis_id
             )
         except Exception as ai_error:
-            logger.error(f"AI generation failed: {str(ai_error)}")
+            logger.error("AI generation failed: %s", ai_error)
             # Return default response when AI fails (using already fetched analysis_data)
-            default_result = generate_default_response(request.question.strip(), analysis_data)
+            default_result = generate_default_response(request.question.strip(), analysis_data, skip_suggestions)
             return ChatResponse(
                 response=default_result['response'],
                 suggested_questions=default_result['suggested_questions'],
@@ -103,11 +353,11 @@ async def agent_chat(request: ChatRequest):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in agent_chat: {str(e)}")
+        logger.error("Unexpected error in agent_chat: %s", e)
         # Return default response for any unexpected errors
         if analysis_data:
             # Use already fetched analysis data if available
-            default_result = generate_default_response(request.question.strip(), analysis_data)
+            default_result = generate_default_response(request.question.strip(), analysis_data, skip_suggestions)
             return ChatResponse(
                 response=default_result['response'],
                 suggested_questions=default_result['suggested_questions'],
@@ -126,17 +376,69 @@ async def agent_chat(request: ChatRequest):
                 analysis_id=request.analysis_id
             )
 
+@router.post("/chat/stream")
+@monitor_usage("gemini_requests")
+async def agent_chat_stream(
+    request: ChatRequest,
+    skip_suggestions: bool = Header(False, alias="X-Skip-Suggestions")
+):
+    """Stream the agent answer as server-sent events so the first words arrive early"""
+    
+    validate_chat_request(request)
+    
+    analysis_id = request.analysis_id.strip()
+    analysis_data = await get_analysis_data(analysis_id)
+    
+    return StreamingResponse(
+        stream_ai_response_with_suggestions(analysis_id, request.question.strip(), analysis_data, skip_suggestions),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def validate_chat_request(request: ChatRequest) -> None:
+    """Enhanced input validation shared by the chat endpoints"""
+    
+    if not request.analysis_id or not request.analysis_id.strip():
+        raise HTTPException(status_code=400, detail="Analysis ID is required")
+    
+    if not request.question or not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question is required")
+    
+    if len(request.question.strip()) > 1000:
+        raise HTTPException(status_code=400, detail="Question too long (max 1000 characters)")
+
 async def get_analysis_data(analysis_id: str) -> Dict[str, Any]:
     """Retrieve and validate analysis data"""
     
+    # Multi-turn chats on a completed analysis are served from memory
+    cached_analysis = analysis_chat_cache.get(analysis_id)
+    if cached_analysis is not None:
+        return cached_analysis
+    
+    # Concurrent misses on the same analysis share one Firestore read
+    fetch = _analysis_fetches.get(analysis_id)
+    if fetch is None:
+        fetch = asyncio.ensure_future(fetch_analysis_data(analysis_id))
+        _analysis_fetches[analysis_id] = fetch
+        fetch.add_done_callback(lambda _: _analysis_fetches.pop(analysis_id, None))
+    
+    return await asyncio.shield(fetch)
+
+async def fetch_analysis_data(analysis_id: str) -> Dict[str, Any]:
+    """Read an analysis from Firestore and check it is ready for chat"""
+    
     try:
-        firestore_client = get_firestore_client()
+        firestore_client = get_async_firestore_client()
+        doc_ref = firestore_client.collection('analyses').document(analysis_id)
         
-        # Use async executor for Firestore operation
-        analysis_doc = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: firestore_client.collection('analyses').document(analysis_id).get()
-        )
+        # Native async read, no executor thread per request. Completed analyses only
+        # need the chat fields; one still in progress has no stored context yet, so
+        # once seen it is read whole rather than masked and then read again
+        masked = analysis_id not in _analyses_in_progress
+        if masked:
+            analysis_doc = await doc_ref.get(field_paths=CHAT_FIELD_PATHS)
+        else:
+            analysis_doc = await doc_ref.get()
         
         if not analysis_doc.exists:
             raise HTTPException(status_code=404, detail="Analysis not found")
@@ -152,371 +454,474 @@ async def get_analysis_data(analysis_id: str) -> Dict[str, Any]:
                 detail=f"Analysis not ready for chat. Current status: {current_status}"
             )
         
+        completed = analysis_data.get('status') == 'completed'
+        if completed:
+            _analyses_in_progress.pop(analysis_id, None)
+        else:
+            _analyses_in_progress[analysis_id] = True
+        
+        # Without a current stored context the prompt is rendered from the full document
+        if not has_current_chat_context(analysis_data):
+            if masked:
+                analysis_doc = await doc_ref.get()
+                analysis_data = analysis_doc.to_dict() or analysis_data
+            
+            # Store the re-rendered context so later reads of a legacy analysis stay masked
+            chat_context = build_chat_context(analysis_data) if completed else None
+            if chat_context:
+                analysis_data['chat_context'] = chat_context
+                await store_chat_context(firestore_client, analysis_doc, chat_context)
+        
+        if completed and has_current_chat_context(analysis_data):
+            analysis_chat_cache[analysis_id] = project_chat_fields(analysis_data)
+        
         return analysis_data
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error retrieving analysis data: {str(e)}")
+        logger.error("Error retrieving analysis data: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve analysis data")
 
-async def build_context_prompt(analysis_data: Dict[str, Any]) -> str:
-    """Build comprehensive context prompt for AI with enhanced investment focus"""
+async def store_chat_context(firestore_client, analysis_doc, chat_context: Dict[str, Any]) -> None:
+    """Best-effort write of a re-rendered chat context, skipped if the analysis changed since it was read"""
     
     try:
-        # Safely extract data with defaults
-        company_name = analysis_data.get('company_name', 'Unknown Company')
-        processed_data = analysis_data.get('processed_data', {})
-        synthesized_data = processed_data.get('synthesized_data', {})
-        
-        # Extract key metrics
-        sector = synthesized_data.get('sector', 'Unknown Sector')
-        stage = synthesized_data.get('stage', 'Unknown Stage')
-        geography = synthesized_data.get('geography', 'Unknown')
-        
-        # Extract financial data
-        financials = synthesized_data.get('financials', {})
-        market = synthesized_data.get('market', {})
-        team = synthesized_data.get('team', {})
-        traction = synthesized_data.get('traction', {})
-        
-        # Extract analysis scores
-        risk_assessment = analysis_data.get('risk_assessment', {})
-        risk_score = risk_assessment.get('overall_risk_score')
-        weighted_scores = analysis_data.get('weighted_scores', {})
-        overall_score = weighted_scores.get('overall_score')
-        
-        # Format recommendation safely
-        recommendation = weighted_scores.get('recommendation', {})
-        if isinstance(recommendation, dict):
-            tier = recommendation.get('tier', 'N/A')
-            rationale = recommendation.get('rationale', 'No rationale provided')
-        else:
-            tier = str(recommendation) if recommendation else 'N/A'
-            rationale = 'No detailed rationale available'
-        
-        # Format top risks
-        top_risks_formatted = format_top_risks(risk_assessment)
-        
-        # Format benchmark performance
-        benchmarking = analysis_data.get('benchmarking', {})
-        benchmark_performance = format_benchmark_performance(benchmarking)
-        
-        # Format founders list (stored as strings with titles and backgrounds)
-        founders_list = "Not disclosed"
-        if team.get('founders'):
-            founders = team.get('founders', [])
-            if isinstance(founders, list) and founders:
-                founders_list = '; '.join([str(f) for f in founders])
-        
-        # Format competitors
-        competitors_list = "Not identified"
-        if market.get('competitors'):
-            competitors = market.get('competitors', [])
-            if isinstance(competitors, list) and competitors:
-                competitors_list = ', '.join(competitors)
-        
-        # Extract additional stored data
-        product = synthesized_data.get('product', {})
-        operations = synthesized_data.get('operations', {})
-        funding = synthesized_data.get('funding', {})
-        
-        # Build context using only stored data
-        context_prompt = f"""
-            You are a senior investment analyst and startup advisor with 15+ years of experience in venture capital. You have conducted a comprehensive analysis of {company_name} and are now answering investor questions with professional expertise. You are a friendly, approachable investment professional who maintains warm relationships while providing data-driven insights.
-
-            COMPANY PROFILE:
-            • Company: {company_name}
-            • Sector: {sector}
-            • Stage: {stage}
-            • Geography: {geography}
-            • Founded: {synthesized_data.get('founded', 'Not disclosed')}
-            • Description: {synthesized_data.get('description', 'Not available')}
-
-            INVESTMENT ANALYSIS SUMMARY:
-            • Overall Investment Score: {f"{overall_score:.1f}/10" if overall_score is not None else "N/A"}
-            • Risk Assessment: {f"{risk_score:.1f}/10" if risk_score is not None else "N/A"} (lower is better)
-            • Investment Recommendation: {tier}
-            • Investment Rationale: {rationale}
-
-            FINANCIAL METRICS (from stored data):
-            • Annual Revenue: ${format_currency(financials.get('revenue'))}
-            • Monthly Revenue (MRR): ${format_currency(financials.get('monthly_revenue'))}
-            • Growth Rate: {format_percentage(financials.get('growth_rate'))} annually
-            • Monthly Growth Rate: {format_percentage(financials.get('monthly_growth_rate'))}
-            • Monthly Burn Rate: ${format_currency(financials.get('burn_rate'))}/month
-            • Runway: {financials.get('runway_months', 'Not disclosed')} months
-            • Total Funding Raised: ${format_currency(financials.get('funding_raised'))}
-            • Current Round: ${format_currency(financials.get('funding_seeking'))}
-            • Valuation: ${format_currency(financials.get('valuation'))}
-            • Gross Margin: {format_percentage(financials.get('gross_margin'))}
-            • CAC: ${format_currency(financials.get('cac'))}
-            • LTV: ${format_currency(financials.get('ltv'))}
-            • LTV/CAC Ratio: {financials.get('ltv_cac_ratio', 'Not disclosed')}
-
-            MARKET DATA (from stored data):
-            • Total Addressable Market (TAM): ${format_currency(market.get('size'))}
-            • Serviceable Addressable Market (SAM): ${format_currency(market.get('sam'))}
-            • Serviceable Obtainable Market (SOM): ${format_currency(market.get('som'))}
-            • Target Customer Segment: {market.get('target_segment', 'Not specified')}
-            • Key Competitors: {competitors_list}
-            • Market Growth Rate: {format_percentage(market.get('growth_rate'))} annually
-            • Competitive Positioning: {market.get('competitive_positioning', 'Not specified')}
-
-            TEAM DATA (from stored data):
-            • Team Size: {team.get('size', 'Not disclosed')} employees
-            • Founders: {founders_list}
-            • Key Hires: {len(team.get('key_hires', [])) if team.get('key_hires') else 0} key roles identified
-            • Advisors: {len(team.get('advisors', [])) if team.get('advisors') else 0} advisors
-            • Team Experience: {team.get('team_experience', 'Not specified')}
-
-            TRACTION DATA (from stored data):
-            • Paying Customers: {format_number(traction.get('customers'))}
-            • Total Users: {format_number(traction.get('users'))}
-            • Monthly Active Users: {format_number(traction.get('mau'))}
-            • Customer Retention Rate: {format_percentage(traction.get('retention_rate'))}
-            • NPS Score: {traction.get('nps_score', 'Not disclosed')}
-            • Key Partnerships: {len(traction.get('partnerships', [])) if traction.get('partnerships') else 0} partnerships
-
-            PRODUCT DATA (from stored data):
-            • Product Name: {product.get('name', 'Not specified')}
-            • Product Stage: {product.get('stage', 'Not specified')}
-            • Business Model: {product.get('business_model', 'Not specified')}
-            • Competitive Advantage: {product.get('competitive_advantage', 'Not specified')}
-            • Technology Stack: {product.get('technology_stack', 'Not specified')}
-            • IP Portfolio: {product.get('intellectual_property', 'Not specified')}
-
-            OPERATIONS DATA (from stored data):
-            • Go-to-Market Strategy: {operations.get('go_to_market', 'Not specified')}
-            • Pricing Strategy: {operations.get('pricing_strategy', 'Not specified')}
-            • Distribution Channels: {len(operations.get('distribution_channels', [])) if operations.get('distribution_channels') else 0} channels
-            • Unit Economics: {operations.get('unit_economics', 'Not specified')}
-
-            TOP INVESTMENT RISKS:
-            {top_risks_formatted}
-
-            BENCHMARK PERFORMANCE:
-            {benchmark_performance}
-
-            RESPONSE GUIDELINES:
-            1. Answer as an experienced investment professional who has thoroughly analyzed this company
-            2. Handle greetings warmly and redirect to investment discussion professionally
-            3. For out-of-scope questions, politely explain limitations and redirect to investment topics
-            4. Reference ONLY the specific data points from the stored analysis above for investment questions
-            5. If data shows "Not disclosed" or "Not specified", acknowledge this limitation
-            6. Be direct and actionable - investors need clear, decisive guidance
-            7. Frame responses in terms of investment implications and decision-making criteria
-            8. Use professional VC terminology and investment frameworks
-            9. Consider the company's stage and sector when providing guidance
-            10. Always tie insights back to potential returns, risks, and investment attractiveness
-            11. Maintain a friendly but professional tone throughout all interactions
-        """
-                    
-        return context_prompt
-        
+        await analysis_doc.reference.update(
+            {'chat_context': chat_context},
+            option=firestore_client.write_option(last_update_time=analysis_doc.update_time)
+        )
     except Exception as e:
-        logger.error(f"Error building context prompt: {str(e)}")
-        return f"Limited context available for {analysis_data.get('company_name', 'this company')}."
+        logger.warning("Could not store chat context for %s: %s", analysis_doc.id, e)
 
-async def generate_ai_response_with_suggestions(context_prompt: str, question: str, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+def project_chat_fields(analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an analysis holding only CHAT_FIELD_PATHS, for the in-memory cache"""
+    
+    projection = {}
+    for path in CHAT_FIELD_PATHS:
+        *parents, leaf = path.split('.')
+        source, target = analysis_data, projection
+        for key in parents:
+            source = source.get(key)
+            if not isinstance(source, dict):
+                break
+            target = target.setdefault(key, {})
+        else:
+            if leaf in source:
+                target[leaf] = source[leaf]
+    return projection
+
+async def generate_ai_response_with_suggestions(analysis_id: str, question: str, analysis_data: Dict[str, Any],
+                                                skip_suggestions: bool = False) -> Dict[str, Any]:
     """Generate AI response with suggested questions in a single API call"""
     
-    try:
-        # Extract key data for context
-        company_name = analysis_data.get('company_name', 'this company')
-        processed_data = analysis_data.get('processed_data', {})
-        synthesized_data = processed_data.get('synthesized_data', {})
-        sector = synthesized_data.get('sector', '')
-        stage = synthesized_data.get('stage', '')
-        
-        # Extract scores and recommendation
-        risk_score = safe_float_convert(
-            analysis_data.get('risk_assessment', {}).get('overall_risk_score', 0)
-        )
-        overall_score = safe_float_convert(
-            analysis_data.get('weighted_scores', {}).get('overall_score', 0)
-        )
-        recommendation = analysis_data.get('weighted_scores', {}).get('recommendation', {})
-        tier = recommendation.get('tier', 'N/A') if isinstance(recommendation, dict) else str(recommendation)
-        
-        # Categorize current question
-        question_category = categorize_question(question)
-        
-        # Use async executor for AI generation
-        def _generate_response():
-            configure_gemini()
-            model = genai.Client(
-                vertexai=True,
-                project=PROJECT_ID,
-                location=GCP_REGION
-            )
-            
-            # Enhanced prompt with specific instructions for both response and suggestions
-            full_prompt = f"""{context_prompt}
-
-                CONVERSATION CONTEXT:
-                This is a Q&A session with an investor who is evaluating this company for potential investment. You are a professional investment analyst friend who provides data-driven insights to make informed investment decisions. The investor values CONCISE, FOCUSED answers.
-
-                INVESTOR QUESTION: "{question}"
-
-                ADDITIONAL CONTEXT FOR SUGGESTIONS:
-                - Company: {company_name}
-                - Sector: {sector}
-                - Stage: {stage}
-                - Investment Score: {overall_score:.1f}/10
-                - Risk Score: {risk_score:.1f}/10
-                - Recommendation: {tier}
-                - Question Category: {question_category}
-
-                CRITICAL INSTRUCTION: You must provide BOTH a response to the question AND 4 suggested follow-up questions in a specific JSON format.
-
-                RESPONSE HANDLING GUIDELINES:
-
-                1. GREETINGS & PLEASANTRIES:
-                   If the question is a greeting (hello, hi, how are you, good morning, etc.), respond warmly and professionally:
-                   - Example: "I'm well, thank you. I'm ready to dive into our discussion regarding [Company Name] and address any questions you have about its investment potential. We have a comprehensive analysis prepared to guide our conversation. Please feel free to begin with your first inquiry."
-                   - Always redirect to the investment analysis after acknowledging the greeting
-                   - Maintain a friendly but professional investment analyst tone
-
-                2. OUT-OF-SCOPE QUESTIONS:
-                   If the question is beyond investment analysis scope (cultural events, personal topics, unrelated subjects, etc.), respond politely:
-                   - Acknowledge the question courteously
-                   - Clearly state the limitation: "The provided investment analysis for [Company Name] focuses exclusively on the company's financial performance, market position, team, product, and associated investment risks. Information regarding [topic] is outside the scope of this investment analysis and is not available in the provided data."
-                   - Redirect with a follow-up: "However, I'd be happy to discuss any aspects of [Company Name]'s investment potential. What specific investment considerations would you like to explore?"
-                   - Be polite but firm about scope boundaries
-
-                3. INVESTMENT-RELATED QUESTIONS:
-                   For questions within scope, follow the standard analysis approach:
-                   - First, identify what specific aspect of the investment the question addresses (financial, risk, market, team, product, etc.)
-                   - Reference relevant data points from the comprehensive analysis above
-                   - Provide quantitative context and benchmarking where available
-                   - Explain the investment implications clearly
-                   - Consider the company's stage and sector context
-                   - Suggest follow-up considerations if relevant
-
-                RESPONSE REQUIREMENTS:
-                • Keep response STRICTLY within 30-150 words - this is critical for user experience
-                • For greetings: Be warm, acknowledge, and redirect to investment discussion
-                • For out-of-scope: Be polite, explain limitations, and redirect with investment-focused follow-up
-                • For investment questions: Answer directly with supporting data
-                • Start with a direct, clear response to the question type
-                • Support with 1-2 key data points from the analysis when relevant
-                • Use concise bullet points if listing multiple items
-                • End with one brief actionable insight related to the question
-                • If data is missing, briefly acknowledge in 1 sentence
-                • Maintain professional investment analyst tone throughout
-                • Be precise and eliminate unnecessary words
-                • WORD COUNT LIMIT: Maximum 150 words, target 40-130 words
-                • IMPORTANT: Complete your response fully within the word limit
-
-                SUGGESTED QUESTIONS REQUIREMENTS:
-                Generate 4 highly relevant follow-up questions that an investor would naturally ask next. Focus on:
-                1. Investment decision-making factors
-                2. Due diligence priorities
-                3. Risk assessment and mitigation
-                4. Return potential and exit strategy
-                5. Competitive positioning and market dynamics
-                6. Management team and execution capability
-
-                Requirements for suggestions:
-                - Questions should be specific to this company's situation
-                - Focus on actionable investment insights
-                - Consider the recommendation tier ({tier}) when framing questions
-                - Address potential investor concerns
-                - Help investors make informed decisions
-                - Be professional and direct
-                - Avoid questions too similar to the current question
-                - Each suggested question must be between 10-30 words maximum
-                - Keep questions concise and focused for better user experience
-
-                MANDATORY JSON OUTPUT FORMAT:
-                You MUST respond with a valid JSON object in exactly this format:
-                {{
-                    "response": "Your 30-150 word response to the investor question here",
-                    "suggested_questions": [
-                        "First suggested follow-up question",
-                        "Second suggested follow-up question", 
-                        "Third suggested follow-up question",
-                        "Fourth suggested follow-up question"
-                    ]
-                }}
-
-                IMPORTANT: Your entire output must be valid JSON. Do not include any text before or after the JSON object."""
+    # Repeated questions on an unchanged analysis skip prompt building and the Gemini round trip
+    cache_key = ai_response_cache_key(analysis_id, question, analysis_data)
+    response = _ai_response_cache.get(cache_key)
+    
+    if response is None:
+        try:
+            chat_prompt, generation_config = await prepare_chat_request(analysis_id, question, analysis_data)
             
-                            
-            generation_config = types.GenerateContentConfig(
-                temperature=0.3,  # Controlled temperature for focused responses
-                top_p=0.9,  # Focused token selection for conciseness
-                top_k=40,
-                candidate_count=1,
-                safety_settings=[
-                    types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="BLOCK_MEDIUM_AND_ABOVE"),
-                    types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="BLOCK_MEDIUM_AND_ABOVE"),
-                    types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="BLOCK_MEDIUM_AND_ABOVE"),
-                    types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="BLOCK_MEDIUM_AND_ABOVE"),
-                ]
-            )
+            # Native async generation, no executor thread held for the whole call
+            async with GEMINI_CHAT_SEMAPHORE:
+                try:
+                    ai_response = await get_gemini_client().aio.models.generate_content(
+                        model=CHAT_MODEL,
+                        contents=[chat_prompt],
+                        config=generation_config
+                    )
+                except errors.ClientError as e:
+                    if not is_rejected_cache(e, generation_config):
+                        raise
+                    chat_prompt, generation_config = retry_inline(analysis_id, question, analysis_data,
+                                                                  generation_config, e)
+                    ai_response = await get_gemini_client().aio.models.generate_content(
+                        model=CHAT_MODEL,
+                        contents=[chat_prompt],
+                        config=generation_config
+                    )
             
-            response = model.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[full_prompt],
-                config=generation_config
-            )
+            response = parse_ai_response(ai_response.text)
             
-            return response.text
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("AI generation error: %s", e)
+            # Re-raise the exception to be caught by the calling function
+            raise Exception(f"AI generation failed: {str(e)}")
+        
+        _ai_response_cache[cache_key] = response
+    
+    return complete_suggestions(response, question, analysis_data, skip_suggestions)
+
+async def stream_ai_response_with_suggestions(analysis_id: str, question: str, analysis_data: Dict[str, Any],
+                                              skip_suggestions: bool = False) -> AsyncIterator[str]:
+    """Stream the AI answer as SSE 'delta' events, then one 'done' event with the parsed result"""
+    
+    cache_key = ai_response_cache_key(analysis_id, question, analysis_data)
+    cached_response = _ai_response_cache.get(cache_key)
+    if cached_response is not None:
+        response = complete_suggestions(cached_response, question, analysis_data, skip_suggestions)
+        yield format_sse('delta', {'delta': response['response']})
+        yield format_sse('done', {**response, 'analysis_id': analysis_id})
+        return
+    
+    try:
+        chat_prompt, generation_config = await prepare_chat_request(analysis_id, question, analysis_data)
+        extractor = ResponseFieldExtractor()
+        deltas = SanitizedDeltas()
+        chunks = []
         
-        response_text = await asyncio.get_event_loop().run_in_executor(None, _generate_response)
+        # The slot is held until the stream is drained or the client goes away
+        async with GEMINI_CHAT_SEMAPHORE:
+            try:
+                stream = await get_gemini_client().aio.models.generate_content_stream(
+                    model=CHAT_MODEL,
+                    contents=[chat_prompt],
+                    config=generation_config
+                )
+            except errors.ClientError as e:
+                if not is_rejected_cache(e, generation_config):
+                    raise
+                chat_prompt, generation_config = retry_inline(analysis_id, question, analysis_data,
+                                                              generation_config, e)
+                stream = await get_gemini_client().aio.models.generate_content_stream(
+                    model=CHAT_MODEL,
+                    contents=[chat_prompt],
+                    config=generation_config
+                )
+            async for chunk in stream:
+                if not chunk.text:
+                    continue
+                chunks.append(chunk.text)
+                delta = deltas.feed(extractor.feed(chunk.text))
+                if delta:
+                    yield format_sse('delta', {'delta': delta})
         
-        if not response_text or not response_text.strip():
-            raise HTTPException(status_code=500, detail="AI model returned empty response")
+        response = parse_ai_response(''.join(chunks))
+        _ai_response_cache[cache_key] = response
+        response = complete_suggestions(response, question, analysis_data, skip_suggestions)
+        delta = deltas.finish(response['response'])
+        if delta:
+            yield format_sse('delta', {'delta': delta})
+        
+    except Exception as e:
+        logger.error("AI streaming error: %s", e)
+        response = generate_default_response(question, analysis_data, skip_suggestions)
+    
+    yield format_sse('done', {**response, 'analysis_id': analysis_id})
+
+async def prepare_chat_request(analysis_id: str, question: str,
+                               analysis_data: Dict[str, Any]) -> Tuple[str, types.GenerateContentConfig]:
+    """Prompt and config for one chat turn, sending only the question when the analysis context is cached"""
+    
+    context_prompt = build_context_prompt(analysis_id, analysis_data)
+    
+    generation_config = get_analysis_generation_config(analysis_id, analysis_data, context_prompt)
+    if generation_config is not None:
+        return build_question_prompt(question), generation_config
+    
+    return build_chat_prompt(context_prompt, question), await get_chat_generation_config()
+
+def get_analysis_generation_config(analysis_id: str, analysis_data: Dict[str, Any],
+                                   context_prompt: str) -> Optional[types.GenerateContentConfig]:
+    """Chat config referencing this analysis's context cache, None while there is none to use"""
+    
+    # An analysis still processing gets a new updated_at at every stage, so a cache
+    # of it would be superseded before the next turn
+    if analysis_data.get('status') != 'completed':
+        return None
+    
+    cache_key = (analysis_id, analysis_data.get('updated_at'))
+    generation_config = analysis_context_caches.get(cache_key)
+    if generation_config is not None:
+        return generation_config
+    
+    # The turn that misses goes inline rather than waiting on the create round trip;
+    # the cache is built in the background for the turns that follow
+    if cache_key not in _analysis_context_cache_failures and cache_key not in _analysis_context_cache_pending:
+        pending = asyncio.ensure_future(create_analysis_context_cache(cache_key, context_prompt))
+        _analysis_context_cache_pending[cache_key] = pending
+        pending.add_done_callback(lambda _: _analysis_context_cache_pending.pop(cache_key, None))
+    
+    return None
+
+async def create_analysis_context_cache(cache_key: tuple, context_prompt: str) -> None:
+    """Create the Vertex cache for one analysis and remember the outcome"""
+    
+    try:
+        cached_content = await get_gemini_client().aio.caches.create(
+            model=CHAT_MODEL,
+            config=types.CreateCachedContentConfig(
+                system_instruction=ANALYST_SYSTEM_PROMPT,
+                contents=[context_prompt],
+                display_name=f"analysis-context-{cache_key[0]}",
+                ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s"
+            )
+        )
+    except Exception as e:
+        logger.warning("Analysis context cache unavailable for %s, sending it inline: %s", cache_key[0], e)
+        _analysis_context_cache_failures[cache_key] = True
+        return
+    
+    analysis_context_caches[cache_key] = _CHAT_GENERATION_CONFIG.model_copy(
+        update={'cached_content': cached_content.name}
+    )
+
+def is_rejected_cache(error: errors.ClientError, generation_config: types.GenerateContentConfig) -> bool:
+    """Whether a failed call referenced a Vertex cache that was refused (e.g. expired or deleted)
+    
+    Rate limiting is left alone: an inline retry would only add load.
+    """
+    return bool(generation_config.cached_content) and error.code != 429
+
+def retry_inline(analysis_id: str, question: str, analysis_data: Dict[str, Any],
+                 generation_config: types.GenerateContentConfig,
+                 error: errors.ClientError) -> Tuple[str, types.GenerateContentConfig]:
+    """Forget a refused cache so later turns stop using it, and return the fully inline request"""
+    global _analyst_cache_config, _analyst_cache_refresh_at
+    
+    logger.warning("Cached chat context %s refused, retrying inline: %s", generation_config.cached_content, error)
+    
+    if generation_config is _analyst_cache_config:
+        _analyst_cache_config = _CHAT_INLINE_CONFIG
+        _analyst_cache_refresh_at = time.monotonic() + ANALYST_CACHE_RETRY_SECONDS
+    else:
+        cache_key = (analysis_id, analysis_data.get('updated_at'))
+        if analysis_context_caches.get(cache_key) is generation_config:
+            del analysis_context_caches[cache_key]
+            _analysis_context_cache_failures[cache_key] = True
+    
+    context_prompt = build_context_prompt(analysis_id, analysis_data)
+    return build_chat_prompt(context_prompt, question), _CHAT_INLINE_CONFIG
+
+async def get_chat_generation_config() -> types.GenerateContentConfig:
+    """Chat config referencing the cached analyst prompt, or carrying it inline when no cache is available"""
+    global _analyst_cache_config, _analyst_cache_refresh_at
+    
+    if time.monotonic() < _analyst_cache_refresh_at:
+        return _analyst_cache_config
+    
+    async with _analyst_cache_lock:
+        if time.monotonic() < _analyst_cache_refresh_at:
+            return _analyst_cache_config
         
-        # Parse and validate JSON response
         try:
-            response = sanitize_for_frontend(response_text.strip()) 
-            validated_suggestions = [] 
-            if isinstance(response['suggested_questions'], list):         
-                validated_suggestions = response['suggested_questions'][:4]
-            if len(validated_suggestions)>=4:
-                return response
-            
-            # Generate context-based default questions if needed
-            context_defaults = generate_context_based_defaults(
-                question, question_category, tier, overall_score, risk_score, 
-                company_name, sector, stage, analysis_data
+            cached_content = await get_gemini_client().aio.caches.create(
+                model=CHAT_MODEL,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=ANALYST_SYSTEM_PROMPT,
+                    display_name="analyst-system-prompt",
+                    ttl=f"{ANALYST_CACHE_TTL_SECONDS}s"
+                )
             )
-            validated_suggestions.extend(context_defaults)
-            response['suggested_questions'] = validated_suggestions[:4]
-            return response
+            _analyst_cache_config = _CHAT_GENERATION_CONFIG.model_copy(update={'cached_content': cached_content.name})
+            _analyst_cache_refresh_at = time.monotonic() + ANALYST_CACHE_TTL_SECONDS - ANALYST_CACHE_REFRESH_MARGIN_SECONDS
         except Exception as e:
-            logger.error(f"Response parsing error: {str(e)}")
-            # If parsing fails, raise exception to trigger default response
-            raise Exception(f"Failed to parse AI response: {str(e)}")
+            logger.warning("Analyst prompt cache unavailable, sending it inline: %s", e)
+            _analyst_cache_config = _CHAT_INLINE_CONFIG
+            _analyst_cache_refresh_at = time.monotonic() + ANALYST_CACHE_RETRY_SECONDS
         
+        return _analyst_cache_config
+
+def build_chat_prompt(context_prompt: str, question: str) -> str:
+    """Build the full Gemini prompt for one investor question"""
+    
+    # Per-analysis context first and the question last, so turns on the same
+    # analysis share the longest possible prompt prefix
+    return CHAT_PROMPT_TEMPLATE.format(
+        context_prompt=context_prompt,
+        question=question,
+        question_category=categorize_question(question)
+    )
+
+def build_question_prompt(question: str) -> str:
+    """Build the per-turn prompt sent alongside a cached analysis context"""
+    
+    return QUESTION_PROMPT_TEMPLATE.format(
+        question=question,
+        question_category=categorize_question(question)
+    )
+
+def parse_ai_response(response_text: str) -> Dict[str, Any]:
+    """Parse the model's JSON answer, keeping at most four suggested questions"""
+    
+    stripped_text = (response_text or "").strip()
+    if not stripped_text:
+        raise HTTPException(status_code=500, detail="AI model returned empty response")
+    
+    # Parse and validate JSON response
+    try:
+        response = sanitize_for_frontend(stripped_text)
+        suggestions = response['suggested_questions']
+        response['suggested_questions'] = suggestions[:4] if isinstance(suggestions, list) else []
+        return response
     except Exception as e:
-        logger.error(f"AI generation error: {str(e)}")
-        # Re-raise the exception to be caught by the calling function
-        raise Exception(f"AI generation failed: {str(e)}")
+        logger.error("Response parsing error: %s", e)
+        # If parsing fails, raise exception to trigger default response
+        raise Exception(f"Failed to parse AI response: {str(e)}")
+
+def complete_suggestions(response: Dict[str, Any], question: str, analysis_data: Dict[str, Any],
+                         skip_suggestions: bool = False) -> Dict[str, Any]:
+    """Top a parsed answer up to four suggestions, or drop them when the client opted out"""
+    
+    if skip_suggestions:
+        return {**response, 'suggested_questions': []}
+    
+    validated_suggestions = response['suggested_questions']
+    if len(validated_suggestions) >= 4:
+        return response
+    
+    # Generate context-based default questions if needed
+    company_name = analysis_data.get('company_name', 'this company')
+    synthesized_data = analysis_data.get('processed_data', {}).get('synthesized_data', {})
+    risk_score = safe_float_convert(
+        analysis_data.get('risk_assessment', {}).get('overall_risk_score', 0)
+    )
+    overall_score = safe_float_convert(
+        analysis_data.get('weighted_scores', {}).get('overall_score', 0)
+    )
+    recommendation = analysis_data.get('weighted_scores', {}).get('recommendation', {})
+    tier = recommendation.get('tier', 'N/A') if isinstance(recommendation, dict) else str(recommendation)
+    
+    context_defaults = generate_context_based_defaults(
+        question, categorize_question(question), tier, overall_score, risk_score, 
+        company_name, synthesized_data.get('sector', ''), synthesized_data.get('stage', ''), analysis_data
+    )
+    return {**response, 'suggested_questions': (validated_suggestions + context_defaults)[:4]}
+
+def format_sse(event: str, payload: Dict[str, Any]) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {orjson.dumps(payload).decode()}\n\n"
+
+class ResponseFieldExtractor:
+    """Incrementally pull the decoded "response" string out of streamed JSON text"""
+    
+    _KEY_RE = re.compile(r'"response"\s*:\s*"')
+    _HIGH_SURROGATE_RE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}')
+    _LONE_SURROGATE_RE = re.compile('[\ud800-\udfff]')
+    
+    def __init__(self):
+        self._buffer = ''
+        self._pos = 0
+        self._in_value = False
+        self._done = False
+    
+    def feed(self, text: str) -> str:
+        """Add streamed text, return the newly completed part of the response value"""
+        if self._done:
+            return ''
+        self._buffer += text
+        
+        if not self._in_value:
+            match = self._KEY_RE.search(self._buffer)
+            if not match:
+                return ''
+            self._in_value = True
+            self._pos = match.end()
+        
+        out = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            if char == '"':
+                self._done = True
+                i += 1
+                break
+            if char == '\\':
+                # Wait for the whole escape sequence before decoding it
+                end = i + 6 if buffer[i + 1:i + 2] == 'u' else i + 2
+                if end > len(buffer):
+                    break
+                # Characters outside the BMP arrive as a surrogate pair of escapes,
+                # which only decode together
+                if self._HIGH_SURROGATE_RE.match(buffer, i):
+                    if end + 2 > len(buffer):
+                        break
+                    if buffer[end:end + 2] == '\\u':
+                        end += 6
+                        if end > len(buffer):
+                            break
+                try:
+                    decoded = json.loads(f'"{buffer[i:end]}"')
+                except ValueError:
+                    decoded = buffer[i + 1:end]
+                # A lone surrogate can't be encoded for the client
+                out.append(self._LONE_SURROGATE_RE.sub('\ufffd', decoded))
+                i = end
+                continue
+            out.append(char)
+            i += 1
+        self._pos = i
+        return ''.join(out)
 
+class SanitizedDeltas:
+    """Turn the raw streamed answer into deltas of its sanitized text
+    
+    The trailing partial word is held back since markdown around it may still close.
+    Cleaning is not always prefix-stable (e.g. a link whose URL is still streaming);
+    once the cleaned text stops extending what was sent, no further deltas are
+    produced and the 'done' event carries the final text.
+    """
+    
+    def __init__(self):
+        self._raw = ''
+        self._sent = ''
+        self._diverged = False
+    
+    def feed(self, raw_delta: str) -> str:
+        """Add decoded answer text, return the newly sanitized part ready to send"""
+        self._raw += raw_delta
+        cut = max(map(self._raw.rfind, ' \n\t'))
+        if cut <= 0:
+            return ''
+        return self._advance(clean_response_text(self._raw[:cut]))
+    
+    def finish(self, final_text: str) -> str:
+        """Return whatever of the final sanitized answer has not been sent yet"""
+        return self._advance(final_text)
+    
+    def _advance(self, text: str) -> str:
+        if self._diverged or not text.startswith(self._sent):
+            self._diverged = True
+            return ''
+        delta = text[len(self._sent):]
+        self._sent = text
+        return delta
+
+def normalize_question(question: str) -> str:
+    """Normalize question text for cache lookups (trailing ?!. and whitespace insensitive)
+
+    Other punctuation is kept: "is burn >$1M" and "is burn <$1M" must not share an answer.
+    """
+    return ' '.join(question.rstrip('?!. \t\n').split())
+
+def ai_response_cache_key(analysis_id: str, question: str, analysis_data: Dict[str, Any]) -> tuple:
+    """Response cache key: a changed analysis (new updated_at) never reuses an old answer"""
+    return (analysis_id, analysis_data.get('updated_at'), normalize_question(question))
+
+@lru_cache(maxsize=4096)
 def categorize_question(question: str) -> str:
     """Categorize question to generate relevant follow-ups with weighted scoring"""
     
     question_lower = question.lower()
-    category_scores = {}
+    best_category = 'general'
+    best_score = 0
     
-    # Score each category based on keyword matches
-    for category, keywords in QUESTION_CATEGORIES.items():
+    # Score each category based on keyword matches, keeping the first highest scorer
+    for category, keyword_weights in CATEGORY_KEYWORD_WEIGHTS:
         score = 0
-        for keyword in keywords:
+        for keyword, weight in keyword_weights:
             if keyword in question_lower:
-                # Give higher weight to longer, more specific keywords
-                score += len(keyword.split())
-        category_scores[category] = score
-    
-    # Return category with highest score, or 'general' if no matches
-    if category_scores and max(category_scores.values()) > 0:
-        return max(category_scores, key=category_scores.get)
+                score += weight
+        if score > best_score:
+            best_category = category
+            best_score = score
     
-    return 'general'
+    # 'general' if no keywords matched
+    return best_category
 
 def generate_context_based_defaults(current_question: str, question_category: str, tier: str, overall_score: float, 
                                    risk_score: float, company_name: str, sector: str, 
@@ -531,24 +936,7 @@ def generate_context_based_defaults(current_question: str, question_category: st
         suggestions = []
         
         # Investment decision-focused questions based on analysis results
-        if tier == 'PASS':
-            suggestions.extend([
-                "What would need to change to make this investment viable?",
-                "Are there any pivot opportunities that could improve the outlook?",
-                "What are the key deal-breakers in this analysis?"
-            ])
-        elif tier == 'PURSUE':
-            suggestions.extend([
-                "What due diligence priorities should we focus on?",
-                "What terms and valuation would be appropriate?",
-                "What could derail this promising opportunity?"
-            ])
-        elif tier == 'CONSIDER':
-            suggestions.extend([
-                "What additional information would tip the decision?",
-                "What are the key risk mitigation strategies?",
-                "How does this compare to other pipeline opportunities?"
-            ])
+        suggestions.extend(TIER_FOLLOW_UPS.get(tier, ()))
         
         # Category-specific intelligent follow-ups
         if question_category == 'financial':
@@ -561,45 +949,11 @@ def generate_context_based_defaults(current_question: str, question_category: st
                 suggestions.append("Is this growth rate sustainable given the current market conditions?")
             if burn_rate and runway:
                 suggestions.append("What's the plan for achieving profitability before runway ends?")
-            suggestions.extend([
-                "How do the unit economics compare to successful companies in this sector?",
-                "What are the key assumptions in their financial projections?"
-            ])
-            
-        elif question_category == 'risk':
-            suggestions.extend([
-                "Which risks pose the greatest threat to investor returns?",
-                "How has management addressed similar risks in the past?",
-                "What early warning indicators should we monitor post-investment?"
-            ])
-            
-        elif question_category == 'market':
-            suggestions.extend([
-                f"What's the competitive response likely to be if {company_name} succeeds?",
-                "How defensible is their market position long-term?",
-                "What market shifts could create new opportunities or threats?"
-            ])
-            
-        elif question_category == 'team':
-            suggestions.extend([
-                "What key hires are critical for the next growth phase?",
-                "How does the team's experience match the execution challenges ahead?",
-                "What governance and board composition would be optimal?"
-            ])
-            
-        elif question_category == 'product':
-            suggestions.extend([
-                "What's the roadmap for maintaining competitive advantage?",
-                "How strong is the intellectual property position?",
-                "What's the customer feedback on product-market fit?"
-            ])
-            
-        elif question_category == 'growth':
-            suggestions.extend([
-                "What are the biggest bottlenecks to scaling?",
-                "How capital efficient is their growth strategy?",
-                "What's the total addressable market they can realistically capture?"
-            ])
+        
+        suggestions.extend(
+            template.format(company_name=company_name)
+            for template in CATEGORY_FOLLOW_UPS.get(question_category, ())
+        )
         
         # Score-based contextual questions
         if overall_score > 7.5:
@@ -617,22 +971,24 @@ def generate_context_based_defaults(current_question: str, question_category: st
             suggestions.append(f"How does this {stage} {sector} company compare to our best investments?")
         
         # Investment process questions
-        suggestions.extend([
-            "What's our expected return profile and exit timeline?",
-            "How does this fit our portfolio strategy and thesis?",
-            "What would be our value-add beyond capital?"
-        ])
+        suggestions.extend(INVESTMENT_PROCESS_FOLLOW_UPS)
         
-        # Remove duplicates and filter out questions too similar to current
+        # Remove duplicates and filter out questions too similar to current,
+        # stopping once the four returned suggestions are found
         unique_suggestions = []
-        current_words = set(current_question.lower().split())
+        seen = set()
+        current_words = frozenset(current_question.lower().split())
+        max_shared_words = 0.5 * max(len(current_words), 1)
         
         for suggestion in suggestions:
-            suggestion_words = set(suggestion.lower().split())
+            if suggestion in seen:
+                continue
+            seen.add(suggestion)
             # Avoid suggestions too similar to current question
-            similarity_ratio = len(current_words.intersection(suggestion_words)) / max(len(current_words), 1)
-            if similarity_ratio < 0.5 and suggestion not in unique_suggestions:
+            if len(current_words.intersection(suggestion.lower().split())) < max_shared_words:
                 unique_suggestions.append(suggestion)
+                if len(unique_suggestions) == 4:
+                    break
         
         # Ensure we have good suggestions
         if not unique_suggestions:
@@ -646,7 +1002,7 @@ def generate_context_based_defaults(current_question: str, question_category: st
         return unique_suggestions[:4]
         
     except Exception as e:
-        logger.warning(f"Error generating context-based defaults: {str(e)}")
+        logger.warning("Error generating context-based defaults: %s", e)
         return [
             "What are the critical investment considerations?",
             "How does this align with our investment strategy?",
@@ -658,6 +1014,10 @@ def generate_context_based_defaults(current_question: str, question_category: st
 def safe_float_convert(value: Any) -> float:
     """Safely convert value to float with fallback"""
     
+    # Stored scores are almost always numbers already; skip the try/except setup
+    if isinstance(value, (int, float)):
+        return float(value)
+    
     if value is None:
         return 0.0
     
@@ -666,124 +1026,7 @@ def safe_float_convert(value: Any) -> float:
     except (ValueError, TypeError):
         return 0.0
 
-def format_currency(value: Any) -> str:
-    """Format currency values with appropriate units"""
-    if value is None:
-        return "Not disclosed"
-    
-    try:
-        num_value = float(value)
-        if num_value >= 1_000_000_000:
-            return f"{num_value / 1_000_000_000:.1f}B"
-        elif num_value >= 1_000_000:
-            return f"{num_value / 1_000_000:.1f}M"
-        elif num_value >= 1_000:
-            return f"{num_value / 1_000:.0f}K"
-        else:
-            return f"{num_value:,.0f}"
-    except (ValueError, TypeError):
-        return "Not disclosed"
-
-def format_percentage(value: Any) -> str:
-    """Format percentage values"""
-    if value is None:
-        return "Not disclosed"
-    
-    try:
-        return f"{float(value):.1f}%"
-    except (ValueError, TypeError):
-        return "Not disclosed"
-
-def format_number(value: Any) -> str:
-    """Format large numbers with appropriate units"""
-    if value is None:
-        return "Not disclosed"
-    
-    try:
-        num_value = float(value)
-        if num_value >= 1_000_000_000:
-            return f"{num_value / 1_000_000_000:.1f}B"
-        elif num_value >= 1_000_000:
-            return f"{num_value / 1_000_000:.1f}M"
-        elif num_value >= 1_000:
-            return f"{num_value / 1_000:.0f}K"
-        else:
-            return f"{num_value:,.0f}"
-    except (ValueError, TypeError):
-        return "Not disclosed"
-
-def format_top_risks(risk_assessment: Dict[str, Any]) -> str:
-    """Format top risks for display"""
-    if not risk_assessment:
-        return "• Risk analysis not available"
-    
-    try:
-        risk_scores = risk_assessment.get('risk_scores', {})
-        risk_explanations = risk_assessment.get('risk_explanations', [])
-        
-        formatted_risks = []
-        
-        # Get top risks from different categories
-        for category, risks in risk_scores.items():
-            if isinstance(risks, list) and risks:
-                for risk in risks[:1]:  # Top risk per category
-                    if isinstance(risk, dict):
-                        risk_type = risk.get('type', 'Unknown risk')
-                        severity = risk.get('severity', 0)
-                        details = risk.get('details', 'No details available')
-                        formatted_risks.append(f"• {risk_type.replace('_', ' ').title()} (Severity: {severity}/10): {details}")
-        
-        # If no structured risks, use explanations
-        if not formatted_risks and risk_explanations:
-            for explanation in risk_explanations[:3]:
-                formatted_risks.append(f"• {str(explanation)}")
-        
-        if not formatted_risks:
-            formatted_risks = ["• Detailed risk analysis not available"]
-        
-        return '\n'.join(formatted_risks[:5])  # Top 5 risks
-        
-    except Exception as e:
-        logger.warning(f"Error formatting risks: {e}")
-        return "• Risk formatting error - raw data available in analysis"
-
-def format_benchmark_performance(benchmarking: Dict[str, Any]) -> str:
-    """Format benchmark performance for display"""
-    if not benchmarking:
-        return "• Benchmark analysis not available"
-    
-    try:
-        percentiles = benchmarking.get('percentiles', {})
-        overall_score = benchmarking.get('overall_score', {})
-        
-        formatted_benchmarks = []
-        
-        if overall_score:
-            score = overall_score.get('score', 'N/A')
-            grade = overall_score.get('grade', 'N/A')
-            formatted_benchmarks.append(f"• Overall Benchmark Score: {score}/100 (Grade: {grade})")
-        
-        # Format key percentiles
-        key_metrics = ['revenue', 'growth_rate', 'team_size', 'burn_rate', 'valuation']
-        for metric in key_metrics:
-            if metric in percentiles:
-                percentile_data = percentiles[metric]
-                if isinstance(percentile_data, dict):
-                    percentile = percentile_data.get('percentile', 'N/A')
-                    interpretation = percentile_data.get('interpretation', '')
-                    metric_name = metric.replace('_', ' ').title()
-                    formatted_benchmarks.append(f"• {metric_name}: {percentile}th percentile - {interpretation}")
-        
-        if not formatted_benchmarks:
-            formatted_benchmarks = ["• Detailed benchmark data not available"]
-        
-        return '\n'.join(formatted_benchmarks[:6])  # Top 6 benchmark insights
-        
-    except Exception as e:
-        logger.warning(f"Error formatting benchmarks: {e}")
-        return "• Benchmark formatting error - raw data available in analysis"
-
-def generate_default_response(question: str, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+def generate_default_response(question: str, analysis_data: Dict[str, Any], skip_suggestions: bool = False) -> Dict[str, Any]:
     """Generate default response when AI fails, with context-aware suggestions"""
     
     try:
@@ -805,12 +1048,15 @@ def generate_default_response(question: str, analysis_data: Dict[str, Any]) -> D
         sector = synthesized_data.get('sector', 'Unknown')
         stage = synthesized_data.get('stage', 'Unknown')
         
-        # Categorize the question to provide relevant context
-        question_category = categorize_question(question)
-        
         # Generate contextual default response
         default_response = f"I apologize, but I'm currently experiencing technical difficulties providing a detailed response to your question about {company_name}. However, I have comprehensive analysis data available and will be able to assist you shortly. The analysis shows this is a {tier.lower()} opportunity with an overall score of {overall_score:.1f}/10."
         
+        if skip_suggestions:
+            return {'response': default_response, 'suggested_questions': []}
+        
+        # Categorize the question to provide relevant context
+        question_category = categorize_question(question)
+        
         # Generate context-aware suggested questions based on analysis data
         suggested_questions = generate_context_based_defaults(
             question, question_category, tier, overall_score, risk_score,
@@ -844,7 +1090,7 @@ def generate_default_response(question: str, analysis_data: Dict[str, Any]) -> D
         }
         
     except Exception as e:
-        logger.error(f"Error generating default response: {str(e)}")
+        logger.error("Error generating default response: %s", e)
         # Ultimate fallback
         return {
             'response': "I apologize, but I'm currently unable to provide a detailed response due to technical difficulties. However, I'm here to help you analyze this investment opportunity once the issue is resolved.",
@@ -3,20 +3,20 @@
 # routers/analysis.py
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from datetime import datetime
-import asyncio
 import logging
 from typing import Dict, Any
 import uuid
 
 from models.schemas import AnalysisRequest, AnalysisResponse
-from models.database import get_firestore_client
+from models.database import get_async_firestore_client
 from services.document_processor import DocumentProcessor
 from services.risk_analyzer import RiskAnalyzer
 from services.benchmark_engine import BenchmarkEngine
 from services.deal_generator import DealNoteGenerator
 from services.weighting_calculator import WeightingCalculator
+from services.chat_context import build_chat_context, invalidate_analysis_cache
 from utils.ai_client import monitor_usage
-from utils.helpers import update_progress
+from utils.helpers import update_progress, ORJSONResponse
 from utils.enhanced_text_cleaner import sanitize_for_frontend, clean_response_dict, clean_response_text
 
 logger = logging.getLogger(__name__)
@@ -44,7 +44,7 @@ def get_weighting_calculator():
 async def start_analysis(
     request: AnalysisRequest, 
     background_tasks: BackgroundTasks,
-    firestore_client=Depends(get_firestore_client)
+    firestore_client=Depends(get_async_firestore_client)
 ):
     """Start new startup analysis"""
     
@@ -62,6 +62,7 @@ async def start_analysis(
             'storage_paths': request.storage_paths,
             'weighting_config': request.weighting_config.model_dump() if request.weighting_config else None,
             'created_at': datetime.now(),
+            'updated_at': datetime.now(),
             'progress': 0,
             'progress_message': 'Analysis initiated',
             'error': None
@@ -69,11 +70,7 @@ async def start_analysis(
 
         try:
             doc_ref = firestore_client.collection('analyses').document(analysis_id)
-            await asyncio.get_event_loop().run_in_executor(
-                None, 
-                doc_ref.set,
-                analysis_doc
-            )
+            await doc_ref.set(analysis_doc)
         except Exception as db_error:
             logger.error(f"Failed to create analysis record: {db_error}")
             raise HTTPException(
@@ -105,17 +102,15 @@ async def process_analysis_safe(analysis_id: str, request: AnalysisRequest):
         logger.error(f"Critical error in background analysis {analysis_id}: {e}")
         # Ensure error state is recorded even if process_analysis fails completely
         try:
-            firestore_client = get_firestore_client()
+            firestore_client = get_async_firestore_client()
             error_update = {
                 'status': 'failed',
                 'error': f"Critical processing error: {str(e)}",
                 'failed_at': datetime.now(),
+                'updated_at': datetime.now(),
                 'progress_message': f'Analysis failed: {str(e)}'
             }
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: firestore_client.collection('analyses').document(analysis_id).update(error_update)
-            )
+            await firestore_client.collection('analyses').document(analysis_id).update(error_update)
         except Exception as update_error:
             logger.critical(f"Failed to record critical error for {analysis_id}: {update_error}")
 
@@ -204,21 +199,29 @@ async def process_analysis(analysis_id: str, request: AnalysisRequest):
             logger.warning(f"Deal note generation failed for {analysis_id}: {e}")
             deal_note = {"error": "Deal note generation failed", "details": str(e)}
                     
+        # Render the chat context once here rather than on every chat request
+        chat_context = build_chat_context({
+            'company_name': request.company_name or 'Unknown',
+            'processed_data': processed_data,
+            'risk_assessment': risk_results,
+            'benchmarking': benchmark_results,
+            'weighted_scores': weighted_scores
+        })
+        
         # Store final results
         final_results = {
             'status': 'completed',
             'deal_note': deal_note,
+            'chat_context': chat_context,
             'completed_at': datetime.now(),
+            'updated_at': datetime.now(),
             'progress': 100,
             'message': 'Analysis completed successfully',
             'error': None
         }
         
-        firestore_client = get_firestore_client()
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: firestore_client.collection('analyses').document(analysis_id).update(final_results)
-        )
+        firestore_client = get_async_firestore_client()
+        await firestore_client.collection('analyses').document(analysis_id).update(final_results)
         
         logger.info(f"Analysis {analysis_id} completed successfully")
         
@@ -229,39 +232,39 @@ async def process_analysis(analysis_id: str, request: AnalysisRequest):
             'status': 'failed',
             'error': str(e),
             'failed_at': datetime.now(),
+            'updated_at': datetime.now(),
             'progress_message': f'Analysis failed: {str(e)}'
         }
         
         try:
-            firestore_client = get_firestore_client()
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: firestore_client.collection('analyses').document(analysis_id).update(error_update)
-            )
+            firestore_client = get_async_firestore_client()
+            await firestore_client.collection('analyses').document(analysis_id).update(error_update)
         except Exception as update_error:
             logger.critical(f"Failed to update error status for {analysis_id}: {update_error}")
 
 
-@router.get("/{analysis_id}")
+# Untyped and large: the handler returns the response itself so FastAPI skips its
+# jsonable_encoder pass and orjson encodes the payload once. Typed routes keep the
+# default class, which serializes through the response model in one pass
+@router.get("/{analysis_id}", response_class=ORJSONResponse)
 async def get_analysis(analysis_id: str):
     """Get analysis results"""
     
     try:
-        # Use async executor for Firestore operation
-        firestore_client = get_firestore_client()
-        doc = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: firestore_client.collection('analyses').document(analysis_id).get()
-        )
+        # Native async read, no executor thread per request
+        firestore_client = get_async_firestore_client()
+        doc = await firestore_client.collection('analyses').document(analysis_id).get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Analysis not found")
         
         data = doc.to_dict()
+        # Chat-only field, not part of the analysis payload
+        data.pop('chat_context', None)
         
         data = serialize_datetime_fields(data)
         
-        return sanitize_for_frontend(data)
+        return ORJSONResponse(sanitize_for_frontend(data))
         
     except HTTPException:
         raise
@@ -273,7 +276,7 @@ async def get_analysis(analysis_id: str):
 async def update_weighting(
     analysis_id: str, 
     weighting_config: dict,
-    firestore_client=Depends(get_firestore_client),
+    firestore_client=Depends(get_async_firestore_client),
     weighting_calc: WeightingCalculator = Depends(get_weighting_calculator)
 ):
     """Recalculate scores with new weightings"""
@@ -289,10 +292,8 @@ async def update_weighting(
         )
     
     try:
-        doc = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: firestore_client.collection('analyses').document(analysis_id).get()
-        )
+        doc_ref = firestore_client.collection('analyses').document(analysis_id)
+        doc = await doc_ref.get()
         
         if not doc.exists:
             raise HTTPException(status_code=404, detail="Analysis not found")
@@ -343,13 +344,12 @@ async def update_weighting(
         update_data = {
             'weighted_scores': new_scores,
             'weighting_config': weighting_config,
+            'chat_context': build_chat_context({**analysis_data, 'weighted_scores': new_scores}),
             'updated_at': datetime.now()
         }
         
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: firestore_client.collection('analyses').document(analysis_id).update(update_data)
-        )
+        await doc_ref.update(update_data)
+        invalidate_analysis_cache(analysis_id)
         
         logger.info(f"Weighting updated successfully for {analysis_id}")
         
@@ -11,7 +11,7 @@ from datetime import timedelta
 
 router = APIRouter()
 
-ALLOWED_MIME_TYPES = {
+ALLOWED_MIME_TYPES = frozenset({
     'application/pdf',
     'text/plain',
     'application/msword',
@@ -19,9 +19,9 @@ ALLOWED_MIME_TYPES = {
     'image/jpeg',
     'image/jpg',
     'image/png'
-}
+})
 
-ALLOWED_EXTENSIONS = {'.pdf', '.txt', '.jpg', '.jpeg', '.png'}
+ALLOWED_EXTENSIONS = frozenset({'.pdf', '.txt', '.jpg', '.jpeg', '.png'})
 
 @router.post("/generate-upload-url")
 async def generate_upload_url(request: DocumentUploadRequest):
@@ -3,10 +3,8 @@ import json
 import asyncio
 from typing import Dict, Optional
 from datetime import datetime
-from google import genai
-from utils.ai_client import configure_gemini
+from utils.ai_client import configure_gemini, get_gemini_client, GEMINI_EXECUTOR
 import logging
-from settings import PROJECT_ID, GCP_REGION
 from utils.enhanced_text_cleaner import sanitize_for_frontend
 
 logger = logging.getLogger(__name__)
@@ -16,11 +14,7 @@ class BenchmarkEngine:
         """Initialize with Gemini configuration"""
         self.gemini_available = configure_gemini()
         if self.gemini_available:
-            self.model = genai.Client(
-                vertexai=True,
-                project=PROJECT_ID,
-                location=GCP_REGION
-            )
+            self.model = get_gemini_client()
             # self.model = genai.GenerativeModel('gemini-pro')
             logger.info("BenchmarkEngine initialized with Gemini AI")
         else:
@@ -128,7 +122,10 @@ class BenchmarkEngine:
             13. NEVER use strings like "N/A", "unknown", "TBD" - only numbers
             """
             
-            response = await asyncio.to_thread(self.model.models.generate_content, model="gemini-2.5-flash", contents = [prompt])
+            response = await asyncio.get_running_loop().run_in_executor(
+                GEMINI_EXECUTOR,
+                lambda: self.model.models.generate_content(model="gemini-2.5-flash", contents = [prompt])
+            )
             if response and hasattr(response, 'text') and response.text:
                 try:
                     return sanitize_for_frontend(response.text.strip())
@@ -338,7 +335,10 @@ class BenchmarkEngine:
             - Forward-looking with market context and competitive dynamics
             """
             
-            response = await asyncio.to_thread(self.model.models.generate_content, model="gemini-2.5-flash",contents = [prompt])
+            response = await asyncio.get_running_loop().run_in_executor(
+                GEMINI_EXECUTOR,
+                lambda: self.model.models.generate_content(model="gemini-2.5-flash",contents = [prompt])
+            )
             insights = []
             if response and hasattr(response, 'text') and response.text:
                 try:
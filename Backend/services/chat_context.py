@@ -0,0 +1,456 @@
+# services/chat_context.py
+from typing import Dict, Any, Optional, Set
+import asyncio
+import logging
+from string import Formatter
+from itertools import islice
+from cachetools import TTLCache
+
+from utils.ai_client import get_gemini_client
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever render_context_prompt output changes so stored chat contexts
+# written by older code are rebuilt instead of served
+CONTEXT_PROMPT_VERSION = 5
+
+# Chat fields of completed analyses, keyed by analysis id. Reweighting is
+# the only write after completion and evicts its entry; the TTL bounds how long
+# another worker can keep serving the pre-reweight copy.
+analysis_chat_cache = TTLCache(maxsize=2048, ttl=300)
+
+# Built context prompts keyed by (analysis id, updated_at). Every write that changes
+# an analysis bumps updated_at, so a changed analysis misses; the TTL bounds stale entries.
+_context_prompt_cache = TTLCache(maxsize=1024, ttl=300)
+
+# Server-side lifetime of the per-analysis Vertex context caches. Local entries are
+# dropped a margin earlier so a turn never references a cache about to expire
+CONTEXT_CACHE_TTL_SECONDS = 3600
+CONTEXT_CACHE_REFRESH_MARGIN_SECONDS = 300
+
+# Pending best-effort deletes of superseded Vertex caches, referenced until done
+_context_cache_deletes: Set[asyncio.Task] = set()
+
+class AnalysisContextCaches(TTLCache):
+    """Chat generation configs referencing per-analysis Vertex caches
+    
+    Keyed by (analysis id, updated_at) so a reweighted analysis gets a fresh cache.
+    An entry evicted for space has its server-side cache deleted instead of left
+    billing storage until its TTL runs out.
+    """
+    
+    def popitem(self):
+        key, generation_config = super().popitem()
+        delete_context_cache(generation_config.cached_content)
+        return key, generation_config
+
+analysis_context_caches = AnalysisContextCaches(
+    maxsize=512, ttl=CONTEXT_CACHE_TTL_SECONDS - CONTEXT_CACHE_REFRESH_MARGIN_SECONDS
+)
+
+# Prompt templates kept flush-left: indentation inside the prompt is billed as input tokens
+CONTEXT_PROMPT_TEMPLATE = """ANALYSIS DATA FOR {company_name}
+
+COMPANY PROFILE:
+Company: {company_name}
+Sector: {sector}
+Stage: {stage}
+Geography: {geography}
+Founded: {founded}
+Description: {description}
+
+INVESTMENT ANALYSIS SUMMARY:
+Overall Investment Score: {overall_score}
+Risk Assessment: {risk_score} (lower is better)
+Investment Recommendation: {tier}
+Investment Rationale: {rationale}
+
+FINANCIAL METRICS:
+Annual Revenue: ${revenue}
+Monthly Revenue (MRR): ${monthly_revenue}
+Growth Rate: {growth_rate} annually
+Monthly Growth Rate: {monthly_growth_rate}
+Monthly Burn Rate: ${burn_rate}/month
+Runway: {runway_months} months
+Total Funding Raised: ${funding_raised}
+Current Round: ${funding_seeking}
+Valuation: ${valuation}
+Gross Margin: {gross_margin}
+CAC: ${cac}
+LTV: ${ltv}
+LTV/CAC Ratio: {ltv_cac_ratio}
+
+MARKET DATA:
+Total Addressable Market (TAM): ${market_size}
+Serviceable Addressable Market (SAM): ${sam}
+Serviceable Obtainable Market (SOM): ${som}
+Target Customer Segment: {target_segment}
+Key Competitors: {competitors_list}
+Market Growth Rate: {market_growth_rate} annually
+Competitive Positioning: {competitive_positioning}
+
+TEAM DATA:
+Team Size: {team_size} employees
+Founders: {founders_list}
+Key Hires: {key_hires} key roles identified
+Advisors: {advisors} advisors
+Team Experience: {team_experience}
+
+TRACTION DATA:
+Paying Customers: {customers}
+Total Users: {users}
+Monthly Active Users: {mau}
+Customer Retention Rate: {retention_rate}
+NPS Score: {nps_score}
+Key Partnerships: {partnerships} partnerships
+
+PRODUCT DATA:
+Product Name: {product_name}
+Product Stage: {product_stage}
+Business Model: {business_model}
+Competitive Advantage: {competitive_advantage}
+Technology Stack: {technology_stack}
+IP Portfolio: {intellectual_property}
+
+OPERATIONS DATA:
+Go-to-Market Strategy: {go_to_market}
+Pricing Strategy: {pricing_strategy}
+Distribution Channels: {distribution_channels} channels
+Unit Economics: {unit_economics}
+
+TOP INVESTMENT RISKS:
+{top_risks_formatted}
+
+BENCHMARK PERFORMANCE:
+{benchmark_performance}
+"""
+
+# Field values that carry no information. Rows showing one are left out
+# of the rendered context so sparse analyses don't pay for filler tokens
+MISSING_CONTEXT_VALUES = frozenset({
+    '', 'Not disclosed', 'Not specified', 'Not available', 'Not identified', 'Unknown', 'N/A'
+})
+
+# The template split into sections of (line, fields shown on that line), parsed once
+CONTEXT_PROMPT_SECTIONS = tuple(
+    tuple(
+        (line, tuple(field for _, field, _, _ in Formatter().parse(line) if field))
+        for line in section.split('\n')
+    )
+    for section in CONTEXT_PROMPT_TEMPLATE.strip().split('\n\n')
+)
+
+# Benchmark percentiles shown in the context prompt, in display order with labels
+BENCHMARK_METRIC_LABELS = (
+    ('revenue', 'Revenue'),
+    ('growth_rate', 'Growth Rate'),
+    ('team_size', 'Team Size'),
+    ('burn_rate', 'Burn Rate'),
+    ('valuation', 'Valuation'),
+)
+
+def invalidate_analysis_cache(analysis_id: str) -> None:
+    """Drop the cached chat copy of an analysis after it has been rewritten"""
+    
+    analysis_chat_cache.pop(analysis_id, None)
+    
+    # Vertex caches of earlier versions are never read again once updated_at moves on
+    for key in [key for key in analysis_context_caches if key[0] == analysis_id]:
+        generation_config = analysis_context_caches.pop(key, None)
+        if generation_config is not None:
+            delete_context_cache(generation_config.cached_content)
+
+def delete_context_cache(cache_name: str) -> None:
+    """Schedule a best-effort delete of a Vertex cache; its TTL covers any failure"""
+    
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_delete_context_cache(cache_name))
+    _context_cache_deletes.add(task)
+    task.add_done_callback(_context_cache_deletes.discard)
+
+async def _delete_context_cache(cache_name: str) -> None:
+    try:
+        await get_gemini_client().aio.caches.delete(name=cache_name)
+    except Exception as e:
+        logger.warning("Could not delete analysis context cache %s: %s", cache_name, e)
+
+def build_context_prompt(analysis_id: str, analysis_data: Dict[str, Any]) -> str:
+    """Build comprehensive context prompt for AI with enhanced investment focus"""
+    
+    # Completed analyses carry the prompt rendered at write time
+    if has_current_chat_context(analysis_data):
+        return analysis_data['chat_context']['prompt']
+    
+    cache_key = (analysis_id, analysis_data.get('updated_at'))
+    cached_prompt = _context_prompt_cache.get(cache_key)
+    if cached_prompt is not None:
+        return cached_prompt
+    
+    try:
+        context_prompt = render_context_prompt(analysis_data)
+        _context_prompt_cache[cache_key] = context_prompt
+        return context_prompt
+        
+    except Exception as e:
+        logger.error("Error building context prompt: %s", e)
+        return f"Limited context available for {analysis_data.get('company_name', 'this company')}."
+
+def has_current_chat_context(analysis_data: Dict[str, Any]) -> bool:
+    """Whether the stored chat context was rendered by the current prompt version"""
+    
+    chat_context = analysis_data.get('chat_context') or {}
+    return chat_context.get('version') == CONTEXT_PROMPT_VERSION and bool(chat_context.get('prompt'))
+
+def build_chat_context(analysis_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Render the chat context for storage alongside the analysis, None on failure"""
+    
+    try:
+        return {
+            'version': CONTEXT_PROMPT_VERSION,
+            'prompt': render_context_prompt(analysis_data)
+        }
+    except Exception as e:
+        logger.warning("Error precomputing chat context: %s", e)
+        return None
+
+def render_context_prompt(analysis_data: Dict[str, Any]) -> str:
+    """Render the analysis context prompt from stored analysis data"""
+    
+    # Safely extract data with defaults
+    company_name = analysis_data.get('company_name', 'Unknown Company')
+    processed_data = analysis_data.get('processed_data') or {}
+    synthesized_data = processed_data.get('synthesized_data') or {}
+    
+    # Extract key metrics
+    sector = synthesized_data.get('sector')
+    stage = synthesized_data.get('stage')
+    geography = synthesized_data.get('geography', 'Unknown')
+    
+    # Extract financial data
+    financials = synthesized_data.get('financials') or {}
+    market = synthesized_data.get('market') or {}
+    team = synthesized_data.get('team') or {}
+    traction = synthesized_data.get('traction') or {}
+    
+    # Extract analysis scores
+    risk_assessment = analysis_data.get('risk_assessment') or {}
+    risk_score = risk_assessment.get('overall_risk_score')
+    weighted_scores = analysis_data.get('weighted_scores') or {}
+    overall_score = weighted_scores.get('overall_score')
+    
+    # Format recommendation safely
+    recommendation = weighted_scores.get('recommendation', {})
+    if isinstance(recommendation, dict):
+        tier = recommendation.get('tier', 'N/A')
+        rationale = recommendation.get('rationale', 'No rationale provided')
+    else:
+        tier = str(recommendation) if recommendation else 'N/A'
+        rationale = 'No detailed rationale available'
+    
+    # Format top risks
+    top_risks_formatted = format_top_risks(risk_assessment)
+    
+    # Format benchmark performance
+    benchmarking = analysis_data.get('benchmarking') or {}
+    benchmark_performance = format_benchmark_performance(benchmarking)
+    
+    # Format founders list (stored as strings with titles and backgrounds)
+    founders_list = "Not disclosed"
+    founders = team.get('founders')
+    if founders and isinstance(founders, list):
+        founders_list = '; '.join(map(str, founders))
+    
+    # Format competitors
+    competitors_list = "Not identified"
+    competitors = market.get('competitors')
+    if competitors and isinstance(competitors, list):
+        competitors_list = ', '.join(competitors)
+    
+    # Extract additional stored data
+    product = synthesized_data.get('product') or {}
+    operations = synthesized_data.get('operations') or {}
+    
+    # Build context using only stored data
+    values = dict(
+        company_name=company_name,
+        sector=sector,
+        stage=stage,
+        geography=geography,
+        founded=synthesized_data.get('founded', 'Not disclosed'),
+        description=synthesized_data.get('description', 'Not available'),
+        overall_score=f"{overall_score:.1f}/10" if overall_score is not None else "N/A",
+        risk_score=f"{risk_score:.1f}/10" if risk_score is not None else "N/A",
+        tier=tier,
+        rationale=rationale,
+        revenue=format_currency(financials.get('revenue')),
+        monthly_revenue=format_currency(financials.get('monthly_revenue')),
+        growth_rate=format_percentage(financials.get('growth_rate')),
+        monthly_growth_rate=format_percentage(financials.get('monthly_growth_rate')),
+        burn_rate=format_currency(financials.get('burn_rate')),
+        runway_months=financials.get('runway_months', 'Not disclosed'),
+        funding_raised=format_currency(financials.get('funding_raised')),
+        funding_seeking=format_currency(financials.get('funding_seeking')),
+        valuation=format_currency(financials.get('valuation')),
+        gross_margin=format_percentage(financials.get('gross_margin')),
+        cac=format_currency(financials.get('cac')),
+        ltv=format_currency(financials.get('ltv')),
+        ltv_cac_ratio=financials.get('ltv_cac_ratio', 'Not disclosed'),
+        market_size=format_currency(market.get('size')),
+        sam=format_currency(market.get('sam')),
+        som=format_currency(market.get('som')),
+        target_segment=market.get('target_segment', 'Not specified'),
+        competitors_list=competitors_list,
+        market_growth_rate=format_percentage(market.get('growth_rate')),
+        competitive_positioning=market.get('competitive_positioning', 'Not specified'),
+        team_size=team.get('size', 'Not disclosed'),
+        founders_list=founders_list,
+        key_hires=count_items(team, 'key_hires') or None,
+        advisors=count_items(team, 'advisors') or None,
+        team_experience=team.get('team_experience', 'Not specified'),
+        customers=format_number(traction.get('customers')),
+        users=format_number(traction.get('users')),
+        mau=format_number(traction.get('mau')),
+        retention_rate=format_percentage(traction.get('retention_rate')),
+        nps_score=traction.get('nps_score', 'Not disclosed'),
+        partnerships=count_items(traction, 'partnerships') or None,
+        product_name=product.get('name', 'Not specified'),
+        product_stage=product.get('stage', 'Not specified'),
+        business_model=product.get('business_model', 'Not specified'),
+        competitive_advantage=product.get('competitive_advantage', 'Not specified'),
+        technology_stack=product.get('technology_stack', 'Not specified'),
+        intellectual_property=product.get('intellectual_property', 'Not specified'),
+        go_to_market=operations.get('go_to_market', 'Not specified'),
+        pricing_strategy=operations.get('pricing_strategy', 'Not specified'),
+        distribution_channels=count_items(operations, 'distribution_channels') or None,
+        unit_economics=operations.get('unit_economics', 'Not specified'),
+        top_risks_formatted=top_risks_formatted,
+        benchmark_performance=benchmark_performance
+    )
+    
+    sections = []
+    for heading, *rows in CONTEXT_PROMPT_SECTIONS:
+        lines = [
+            line.format_map(values) for line, fields in rows
+            if not any(is_missing_value(values[field]) for field in fields)
+        ]
+        # Drop a heading whose rows were all empty
+        if lines or not rows:
+            sections.append('\n'.join([heading[0].format_map(values), *lines]))
+    
+    return '\n\n'.join(sections) + '\n'
+
+def is_missing_value(value: Any) -> bool:
+    """Whether a context field has nothing worth showing the model"""
+    
+    return value is None or (isinstance(value, str) and value.strip() in MISSING_CONTEXT_VALUES)
+
+def count_items(data: Dict[str, Any], key: str) -> int:
+    """Length of a list field, 0 when it is missing or empty"""
+    
+    value = data.get(key)
+    return len(value) if value else 0
+
+def format_magnitude(value: Any) -> str:
+    """Scale a number to B/M/K units, shared by the currency and count formatters"""
+    if value is None:
+        return "Not disclosed"
+    
+    try:
+        num_value = float(value)
+        # Unit cutoffs sit where rounding would carry into the next unit,
+        # so 999,950 shows as 1.0M rather than 1000K and 999.5 as 1K rather than 1,000
+        if num_value >= 999_950_000:
+            return f"{num_value / 1_000_000_000:.1f}B"
+        elif num_value >= 999_500:
+            return f"{num_value / 1_000_000:.1f}M"
+        elif num_value >= 999.5:
+            return f"{num_value / 1_000:.0f}K"
+        else:
+            return f"{num_value:,.0f}"
+    except (ValueError, TypeError):
+        return "Not disclosed"
+
+def format_currency(value: Any) -> str:
+    """Format currency values with appropriate units"""
+    return format_magnitude(value)
+
+def format_percentage(value: Any) -> str:
+    """Format percentage values"""
+    if value is None:
+        return "Not disclosed"
+    
+    try:
+        return f"{float(value):.1f}%"
+    except (ValueError, TypeError):
+        return "Not disclosed"
+
+def format_number(value: Any) -> str:
+    """Format large numbers with appropriate units"""
+    return format_magnitude(value)
+
+def format_top_risks(risk_assessment: Dict[str, Any]) -> str:
+    """Format top risks for display"""
+    if not risk_assessment:
+        return "• Risk analysis not available"
+    
+    try:
+        risk_scores = risk_assessment.get('risk_scores') or {}
+        risk_explanations = risk_assessment.get('risk_explanations') or ()
+        
+        # Top risk per category, formatting stops once five rows are collected
+        formatted_risks = list(islice((
+            f"• {risk.get('type', 'Unknown risk').replace('_', ' ').title()} "
+            f"(Severity: {risk.get('severity', 0)}/10): {risk.get('details', 'No details available')}"
+            for risks in risk_scores.values()
+            if isinstance(risks, list) and risks and isinstance(risk := risks[0], dict)
+        ), 5))
+        
+        # If no structured risks, use explanations
+        if not formatted_risks and risk_explanations:
+            for explanation in risk_explanations[:3]:
+                formatted_risks.append(f"• {str(explanation)}")
+        
+        if not formatted_risks:
+            formatted_risks = ["• Detailed risk analysis not available"]
+        
+        return '\n'.join(formatted_risks)
+        
+    except Exception as e:
+        logger.warning("Error formatting risks: %s", e)
+        return "• Risk formatting error - raw data available in analysis"
+
+def format_benchmark_performance(benchmarking: Dict[str, Any]) -> str:
+    """Format benchmark performance for display"""
+    if not benchmarking:
+        return "• Benchmark analysis not available"
+    
+    try:
+        percentiles = benchmarking.get('percentiles') or {}
+        overall_score = benchmarking.get('overall_score')
+        
+        formatted_benchmarks = []
+        
+        if overall_score:
+            score = overall_score.get('score', 'N/A')
+            grade = overall_score.get('grade', 'N/A')
+            formatted_benchmarks.append(f"• Overall Benchmark Score: {score}/100 (Grade: {grade})")
+        
+        # Format key percentiles
+        for metric, metric_name in BENCHMARK_METRIC_LABELS:
+            percentile_data = percentiles.get(metric)
+            if isinstance(percentile_data, dict):
+                percentile = percentile_data.get('percentile', 'N/A')
+                interpretation = percentile_data.get('interpretation', '')
+                formatted_benchmarks.append(f"• {metric_name}: {percentile}th percentile - {interpretation}")
+        
+        if not formatted_benchmarks:
+            formatted_benchmarks = ["• Detailed benchmark data not available"]
+        
+        return '\n'.join(formatted_benchmarks[:6])  # Top 6 benchmark insights
+        
+    except Exception as e:
+        logger.warning("Error formatting benchmarks: %s", e)
+        return "• Benchmark formatting error - raw data available in analysis"
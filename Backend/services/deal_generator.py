@@ -1,5 +1,4 @@
 # services/deal_generator.py
-from google import genai
 from google.genai import types
 
 import json
@@ -10,8 +9,7 @@ import os
 from dataclasses import dataclass
 import asyncio
 from functools import wraps
-from utils.ai_client import configure_gemini
-from settings import PROJECT_ID, GCP_REGION
+from utils.ai_client import configure_gemini, get_gemini_client, GEMINI_EXECUTOR
 from utils.enhanced_text_cleaner import sanitize_for_frontend
 
 logger = logging.getLogger(__name__)
@@ -66,11 +64,7 @@ class DealNoteGenerator:
         """Initialize Google Generative AI with proper error handling"""
         try:
             configure_gemini()
-            self._model = genai.Client(
-                vertexai=True,
-                project=PROJECT_ID,
-                location=GCP_REGION
-            )
+            self._model = get_gemini_client()
             
             logger.info("Google Generative AI initialized successfully")
         except Exception as e:
@@ -406,8 +400,8 @@ class DealNoteGenerator:
                     candidate_count=1
                 )
 
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, 
+                response = await asyncio.get_running_loop().run_in_executor(
+                    GEMINI_EXECUTOR, 
                     lambda: self._model.models.generate_content(model="gemini-2.5-flash",contents = [prompt], config=generation_config)
                 )
                 
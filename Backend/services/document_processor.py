@@ -3,17 +3,14 @@ import asyncio
 import aiohttp
 import os
 from typing import List, Dict, Any
-from google import genai
-from firebase_admin import storage
 import json
 import logging
 from datetime import timedelta
 from io import BytesIO
-from utils.ai_client import configure_gemini
+from utils.ai_client import configure_gemini, get_gemini_client, GEMINI_EXECUTOR
 from models.database import get_storage_bucket
 import re
 from urllib.parse import urlparse
-from settings import PROJECT_ID, GCP_REGION
 from utils.enhanced_text_cleaner import sanitize_for_frontend
 
 logger = logging.getLogger(__name__)
@@ -26,11 +23,7 @@ class DocumentProcessor:
     def __init__(self):
         self.gemini_available = configure_gemini()
         if self.gemini_available:
-            self.model = genai.Client(
-                vertexai=True,
-                project=PROJECT_ID,
-                location=GCP_REGION
-            )
+            self.model = get_gemini_client()
             logger.info("DocumentProcessor initialized with Gemini multimodal support")
         else:
             logger.warning("Gemini not available - using basic text processing only")
@@ -39,7 +32,7 @@ class DocumentProcessor:
         # File type classifications
 
     def get_file_uri(self, file_path: str) -> str:
-        bucket = storage.bucket()
+        bucket = get_storage_bucket()
         blob = bucket.blob(file_path)
         if not blob.exists():
             raise FileNotFoundError(f"The file '{file_path}' does not exist in Firebase Storage.")
@@ -69,7 +62,10 @@ class DocumentProcessor:
             })
 
         try:
-            response = await asyncio.to_thread(self.model.models.generate_content, model="gemini-2.5-flash", contents=contents)
+            response = await asyncio.get_running_loop().run_in_executor(
+                GEMINI_EXECUTOR,
+                lambda: self.model.models.generate_content(model="gemini-2.5-flash", contents=contents)
+            )
             
             if not response or not hasattr(response, 'text') or not response.text:
                 logger.error(f"Empty synthesis response from Gemini while processing documents")
@@ -2,10 +2,9 @@
 import asyncio
 from typing import Dict, List, Optional, Any
 import json
+import orjson
 import logging
-from google import genai
-from utils.ai_client import configure_gemini
-from settings import PROJECT_ID, GCP_REGION
+from utils.ai_client import configure_gemini, get_gemini_client, GEMINI_EXECUTOR
 from utils.enhanced_text_cleaner import sanitize_for_frontend
 
 logger = logging.getLogger(__name__)
@@ -45,13 +44,20 @@ class RiskAnalyzer:
             }
         
         try:
+            # Serialize once for all category prompts (limit size)
+            try:
+                analysis_data = orjson.dumps(startup_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()[:4000]
+            except (orjson.JSONEncodeError, TypeError):
+                # orjson rejects values json can still stringify (e.g. Decimal, oversized ints)
+                analysis_data = json.dumps(startup_data, default=str, indent=2)[:4000]
+            
             # AI-first approach: Try AI analysis for each category first
             risk_analysis_tasks = [
-                self._analyze_category_risks_ai_first(startup_data, "financial"),
-                self._analyze_category_risks_ai_first(startup_data, "market"),
-                self._analyze_category_risks_ai_first(startup_data, "team"),
-                self._analyze_category_risks_ai_first(startup_data, "product"),
-                self._analyze_category_risks_ai_first(startup_data, "operational")
+                self._analyze_category_risks_ai_first(startup_data, "financial", analysis_data),
+                self._analyze_category_risks_ai_first(startup_data, "market", analysis_data),
+                self._analyze_category_risks_ai_first(startup_data, "team", analysis_data),
+                self._analyze_category_risks_ai_first(startup_data, "product", analysis_data),
+                self._analyze_category_risks_ai_first(startup_data, "operational", analysis_data)
             ]
             
             # Execute all risk analyses concurrently
@@ -529,12 +535,12 @@ class RiskAnalyzer:
         return risks
 
 
-    async def _analyze_category_risks_ai_first(self, data: Dict, category: str) -> List[Dict]:
+    async def _analyze_category_risks_ai_first(self, data: Dict, category: str, analysis_data: str) -> List[Dict]:
         """AI-first risk analysis for a specific category with fallback mechanism"""
         
         try:
             # First, try AI analysis
-            ai_risks = await self._ai_risk_analysis_for_category(data, category)
+            ai_risks = await self._ai_risk_analysis_for_category(analysis_data, category)
             
             # Check if we have enough risks (minimum 3)
             if len(ai_risks) >= 3:
@@ -563,13 +569,10 @@ class RiskAnalyzer:
             # Complete fallback to default risk analysis
             return self._generate_fallback_risks(category, data)
 
-    async def _ai_risk_analysis_for_category(self, data: Dict, risk_context: str) -> List[Dict]:
+    async def _ai_risk_analysis_for_category(self, analysis_data: str, risk_context: str) -> List[Dict]:
         """Use Gemini AI for advanced risk pattern detection with specific context"""
 
         try:
-            # Prepare data for AI analysis (limit size)
-            analysis_data = json.dumps(data, indent=2)[:4000]
-            
             # Define context-specific risk frameworks
             risk_frameworks = {
                 "financial": {
@@ -698,13 +701,12 @@ class RiskAnalyzer:
             Return only the JSON array with risks specifically related to key metric: {risk_context} and focus area: {focus_area.lower()}.
             """
             
-            model = genai.Client(
-                vertexai=True,
-                project=PROJECT_ID,
-                location=GCP_REGION
-            )
+            model = get_gemini_client()
             
-            response = await asyncio.to_thread(model.models.generate_content, model="gemini-2.5-flash", contents=[prompt])
+            response = await asyncio.get_running_loop().run_in_executor(
+                GEMINI_EXECUTOR,
+                lambda: model.models.generate_content(model="gemini-2.5-flash", contents=[prompt])
+            )
 
             if not response or not hasattr(response, 'text') or not response.text:
                 logger.error(f"Empty risk response for {risk_context}")
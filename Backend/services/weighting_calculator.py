@@ -3,18 +3,12 @@
 # services/weighting_calculator.py
 from typing import Dict, List
 from utils.helpers import update_progress
+from models.schemas import DEFAULT_WEIGHTS
 
 
 class WeightingCalculator:
     def __init__(self):
-        self.default_weights = {
-            'growth_potential': 0.25,
-            'market_opportunity': 0.20,
-            'team_quality': 0.20,
-            'product_technology': 0.15,
-            'financial_metrics': 0.10,
-            'competitive_position': 0.10
-        }
+        self.default_weights = DEFAULT_WEIGHTS.copy()
 
     async def calculate_weighted_score(self, analysis_id: str, startup_data: Dict, risk_assessment: Dict, 
                                      benchmark_results: Dict, weighting_config: Dict) -> Dict:
@@ -6,4 +6,10 @@ load_dotenv(find_dotenv())
 BUCKET_ID = getenv("BUCKET_ID")
 PROJECT_ID = getenv("PROJECT_ID")
 GCP_REGION = getenv("GCP_REGION")
-FIREBASE_CONFIG_JSON = getenv("FIREBASE_CONFIG_JSON")
\ No newline at end of file
+FIREBASE_CONFIG_JSON = getenv("FIREBASE_CONFIG_JSON")
+
+# Thread pool size for blocking SDK calls
+GEMINI_MAX_WORKERS = int(getenv("GEMINI_MAX_WORKERS", "16"))
+
+# Chat generations allowed in flight per worker, size to the Vertex AI quota
+GEMINI_CHAT_CONCURRENCY = int(getenv("GEMINI_CHAT_CONCURRENCY", "32"))
\ No newline at end of file
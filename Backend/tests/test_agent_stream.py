@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+import orjson
+
+from routers import agent
+from routers.agent import ResponseFieldExtractor, SanitizedDeltas, format_sse
+
+
+ANSWER = "Revenue grew **3x** this year \U0001F680 and burn is flat."
+SUGGESTIONS = ["What drives the growth?"]
+
+
+def model_output() -> str:
+    # Gemini escapes non-ASCII, so the rocket arrives as a surrogate pair
+    return json.dumps({'response': ANSWER, 'suggested_questions': SUGGESTIONS})
+
+
+def split_every(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def parse_events(events):
+    parsed = []
+    for event in events:
+        name, data = event.strip().split('\n')
+        parsed.append((name[len('event: '):], orjson.loads(data[len('data: '):])))
+    return parsed
+
+
+def test_extractor_joins_surrogate_pair_split_across_chunks():
+    text = model_output()
+    escape = text.index('\\ud83d')
+    # Split inside the high surrogate, between the halves and inside the low one
+    for cut in (escape + 3, escape + 6, escape + 7, escape + 9):
+        extractor = ResponseFieldExtractor()
+        out = extractor.feed(text[:cut]) + extractor.feed(text[cut:])
+        assert out == ANSWER
+
+
+def test_extractor_replaces_lone_surrogate():
+    extractor = ResponseFieldExtractor()
+    out = extractor.feed('{"response": "a \\ud83d b"}')
+    assert out == 'a � b'
+    format_sse('delta', {'delta': out})
+
+
+def test_sanitized_deltas_add_up_to_final_text():
+    extractor = ResponseFieldExtractor()
+    deltas = SanitizedDeltas()
+    sent = ''.join(deltas.feed(extractor.feed(chunk)) for chunk in split_every(model_output(), 5))
+    assert '**' not in sent
+    final_text = "Revenue grew 3x this year \U0001F680 and burn is flat."
+    assert sent + deltas.finish(final_text) == final_text
+
+
+def test_stream_with_non_bmp_character(monkeypatch):
+    class Chunk:
+        def __init__(self, text):
+            self.text = text
+
+    async def fake_stream():
+        for piece in split_every(model_output(), 4):
+            yield Chunk(piece)
+
+    class FakeModels:
+        async def generate_content_stream(self, **kwargs):
+            return fake_stream()
+
+    class FakeClient:
+        class aio:
+            models = FakeModels()
+
+    async def fake_prepare(analysis_id, question, analysis_data):
+        return 'prompt', None
+
+    monkeypatch.setattr(agent, 'get_gemini_client', lambda: FakeClient())
+    monkeypatch.setattr(agent, 'prepare_chat_request', fake_prepare)
+
+    async def collect():
+        analysis_data = {'updated_at': None, 'company_name': 'Acme'}
+        return [event async for event in agent.stream_ai_response_with_suggestions(
+            'stream-test', 'How is growth?', analysis_data, skip_suggestions=True
+        )]
+
+    events = parse_events(asyncio.run(collect()))
+    name, done = events[-1]
+    assert name == 'done'
+    assert done['analysis_id'] == 'stream-test'
+    assert done['response'] == "Revenue grew 3x this year \U0001F680 and burn is flat."
+    assert ''.join(payload['delta'] for name, payload in events[:-1]) == done['response']
+
+
+def test_refused_analysis_cache_is_evicted_and_retried_inline(monkeypatch):
+    from google.genai import errors, types
+    from services.chat_context import analysis_context_caches
+
+    analysis_data = {'status': 'completed', 'updated_at': 1, 'company_name': 'Acme'}
+    cache_key = ('refused-test', 1)
+    analysis_context_caches[cache_key] = types.GenerateContentConfig(cached_content='cachedContents/gone')
+    configs = []
+
+    class FakeModels:
+        async def generate_content_stream(self, config, **kwargs):
+            configs.append(config)
+            if config.cached_content:
+                raise errors.ClientError(404, {'error': {'message': 'cache not found'}})
+
+            async def stream():
+                yield type('Chunk', (), {'text': model_output()})()
+            return stream()
+
+    class FakeClient:
+        class aio:
+            models = FakeModels()
+
+    monkeypatch.setattr(agent, 'get_gemini_client', lambda: FakeClient())
+
+    async def collect():
+        return [event async for event in agent.stream_ai_response_with_suggestions(
+            'refused-test', 'How is growth?', analysis_data, skip_suggestions=True
+        )]
+
+    name, done = parse_events(asyncio.run(collect()))[-1]
+    assert done['response'] == "Revenue grew 3x this year \U0001F680 and burn is flat."
+    assert [bool(config.cached_content) for config in configs] == [True, False]
+    assert cache_key not in analysis_context_caches
@@ -2,12 +2,14 @@
 
 # utils/ai_client.py
 from google import genai
+import asyncio
 import os
-from functools import wraps
+from functools import wraps, cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from fastapi import HTTPException
 import logging
-from settings import PROJECT_ID, GCP_REGION
+from settings import PROJECT_ID, GCP_REGION, GEMINI_MAX_WORKERS, GEMINI_CHAT_CONCURRENCY
 
 
 logger = logging.getLogger(__name__)
@@ -16,6 +18,22 @@ logger = logging.getLogger(__name__)
 cost_monitor = None
 _gemini_configured = False
 
+# Blocking Gemini SDK calls run here so slow generations don't starve Firestore I/O
+GEMINI_EXECUTOR = ThreadPoolExecutor(max_workers=GEMINI_MAX_WORKERS, thread_name_prefix="gemini")
+
+# Chat calls use the async SDK and never touch the executor, so they are bounded
+# here instead. Bursts wait for a slot rather than all hitting the quota at once
+GEMINI_CHAT_SEMAPHORE = asyncio.Semaphore(GEMINI_CHAT_CONCURRENCY)
+
+@cache
+def get_gemini_client() -> genai.Client:
+    """Shared Vertex AI Gemini client, created on first use and reused across requests"""
+    return genai.Client(
+        vertexai=True,
+        project=PROJECT_ID,
+        location=GCP_REGION
+    )
+
 def configure_gemini():
     """Centralized Gemini configuration"""
     global _gemini_configured
@@ -25,11 +43,7 @@ def configure_gemini():
     
     try:
         # TODO: implement better check for if gemini is configured
-        client = genai.Client(
-            vertexai=True,
-            project=PROJECT_ID,
-            location=GCP_REGION
-        )
+        get_gemini_client()
         _gemini_configured = True
         logger.info("Gemini configured successfully")
         return True
@@ -47,7 +61,7 @@ def init_ai_clients():
     # Initialize cost monitoring
     cost_monitor = CostMonitor()
     
-    print("AI clients initialized successfully")
+    logger.info("AI clients initialized successfully")
 
 class CostMonitor:
     def __init__(self):
@@ -6,9 +6,29 @@ Handles comprehensive formatting cleanup for all data types.
 
 import re
 import json
+import orjson
 from typing import Dict, List, Any, Union
 
 
+# Patterns used on every cleaned string, compiled once at import
+_CODE_BLOCK_RE = re.compile(r'```[\s\S]*?```')
+_INLINE_CODE_RE = re.compile(r'`([^`]+)`')
+_HEADER_RE = re.compile(r'^#{1,6}\s+', re.MULTILINE)
+_BOLD_STAR_RE = re.compile(r'\*\*([^*]+)\*\*')
+_BOLD_UNDERSCORE_RE = re.compile(r'__([^_]+)__')
+_ITALIC_STAR_RE = re.compile(r'\*([^*]+)\*')
+_ITALIC_UNDERSCORE_RE = re.compile(r'(?<!\w)_([^_\s]+)_(?!\w)')
+_STRIKETHROUGH_RE = re.compile(r'~~([^~]+)~~')
+_LINK_RE = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+_BULLET_RE = re.compile(r'^[\s]*[-*+•]\s+', re.MULTILINE)
+_NUMBERED_LIST_RE = re.compile(r'^\s*\d+\.\s+', re.MULTILINE)
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_PUNCTUATION_ARTIFACTS_RE = re.compile(r'[*~`#]+')
+_WHITESPACE_RUN_RE = re.compile(r'\s{2,}')
+_JSON_CODE_BLOCK_RE = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
+_JSON_DECODER = json.JSONDecoder()
+
+
 def clean_response_text(text: str) -> str:
     """
     Enhanced text cleaning with comprehensive markdown and formatting removal
@@ -23,33 +43,33 @@ def clean_response_text(text: str) -> str:
         return text
     
     # Remove code blocks (```code```)
-    text = re.sub(r'```[\s\S]*?```', '', text)
-    text = re.sub(r'`([^`]+)`', r'\1', text)
+    text = _CODE_BLOCK_RE.sub('', text)
+    text = _INLINE_CODE_RE.sub(r'\1', text)
     
     # Remove headers (# ## ### etc.)
-    text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
+    text = _HEADER_RE.sub('', text)
     
     # Remove bold markdown (**text** and __text__)
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)
-    text = re.sub(r'__([^_]+)__', r'\1', text)
+    text = _BOLD_STAR_RE.sub(r'\1', text)
+    text = _BOLD_UNDERSCORE_RE.sub(r'\1', text)
     
     # Remove italic markdown (*text* only, preserve standalone underscores)
-    text = re.sub(r'\*([^*]+)\*', r'\1', text)
+    text = _ITALIC_STAR_RE.sub(r'\1', text)
     # Only remove underscores when they're clearly markdown formatting (surrounded by non-underscore chars)
-    text = re.sub(r'(?<!\w)_([^_\s]+)_(?!\w)', r'\1', text)
+    text = _ITALIC_UNDERSCORE_RE.sub(r'\1', text)
     
     # Remove strikethrough (~~text~~)
-    text = re.sub(r'~~([^~]+)~~', r'\1', text)
+    text = _STRIKETHROUGH_RE.sub(r'\1', text)
     
     # Remove links [text](url) -> text
-    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
+    text = _LINK_RE.sub(r'\1', text)
     
     # Remove bullet points and list markers
-    text = re.sub(r'^[\s]*[-*+•]\s+', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
+    text = _BULLET_RE.sub('', text)
+    text = _NUMBERED_LIST_RE.sub('', text)
     
     # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    text = _HTML_TAG_RE.sub('', text)
     
     # Handle various newline formats (preserve regular spaces)
     text = text.replace('\\n', ' ')
@@ -73,10 +93,10 @@ def clean_response_text(text: str) -> str:
 
     
     # Remove extra punctuation artifacts (exclude underscores and preserve spaces)
-    text = re.sub(r'[*~`#]+', '', text)
+    text = _PUNCTUATION_ARTIFACTS_RE.sub('', text)
     
     # Normalize excessive whitespace (multiple spaces/tabs to single space, but preserve single spaces)
-    text = re.sub(r'\s{2,}', ' ', text)
+    text = _WHITESPACE_RUN_RE.sub(' ', text)
     
     # Remove leading/trailing whitespace
     text = text.strip()
@@ -173,22 +193,33 @@ def extract_json_from_text(text: str) -> Union[Dict, List, str]:
     if not text:
         return text
     
-    # Try to find JSON in code blocks first
-    json_match = re.search(r'```(?:json)?\s*(\{[\s\S]*?\}|\[[\s\S]*?\])\s*```', text)
-    if json_match:
+    # Bare JSON is the common case, parse it without any scanning
+    stripped = text.strip()
+    if stripped[:1] in ('{', '['):
         try:
-            return json.loads(json_match.group(1))
-        except json.JSONDecodeError:
+            return orjson.loads(stripped)
+        except orjson.JSONDecodeError:
             pass
     
-    # Try to find JSON without code blocks
-    json_match = re.search(r'(\{[\s\S]*\}|\[[\s\S]*\])', text)
+    # Try to find JSON in code blocks next
+    json_match = _JSON_CODE_BLOCK_RE.search(text)
     if json_match:
         try:
-            return json.loads(json_match.group(1))
-        except json.JSONDecodeError:
+            return orjson.loads(json_match.group(1))
+        except orjson.JSONDecodeError:
             pass
     
+    # Decode the first complete value embedded in prose. The decoder tracks
+    # string literals, so brackets inside values don't cut the match short.
+    # Objects are tried first so a citation like "[1]" ahead of the payload isn't taken for it
+    for opener in ('{', '['):
+        start = text.find(opener)
+        while start != -1:
+            try:
+                return _JSON_DECODER.raw_decode(text, start)[0]
+            except ValueError:
+                start = text.find(opener, start + 1)
+    
     # If no JSON found, return cleaned text
     return clean_response_text(text)
 
@@ -1,7 +1,18 @@
-import asyncio
-from models.database import get_firestore_client
+import logging
+import orjson
+from fastapi.responses import JSONResponse
+from models.database import get_async_firestore_client
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib json module"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
 
 async def update_progress(analysis_id: str, progress: int = None, message: str = "", **kwargs: dict):
     """Update analysis progress"""
@@ -15,10 +26,7 @@ async def update_progress(analysis_id: str, progress: int = None, message: str =
             update_data.update({'message': message})
         if kwargs:
             update_data.update({**kwargs})
-        firestore_client = get_firestore_client()
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: firestore_client.collection('analyses').document(analysis_id).update(update_data)
-        )
+        firestore_client = get_async_firestore_client()
+        await firestore_client.collection('analyses').document(analysis_id).update(update_data)
     except Exception as e:
-        print(f"Failed to update progress for {analysis_id}: {e}")
\ No newline at end of file
+        logger.error(f"Failed to update progress for {analysis_id}: {e}")
\ No newline at end of file